@@ -2,8 +2,10 @@
 
 from typing import Dict, List, Optional
 from model import Habit
-from database import load_habits, DEFAULT_DATABASE
+from database import load_habits, load_habit_with_longest_streak, load_longest_streak, DEFAULT_DATABASE
+import profiling
 
+@profiling.instrument_class
 class Analytics:
     """
     Responsible for handling data for analytic purposes including:
@@ -37,18 +39,10 @@ class Analytics:
         """
         Returns the habit with the longest streak.
         """
-        habits = load_habits(db_path=db_path)
-        if not habits:
-            return None
-        max_habit = max(habits, key=lambda habit: habit.longest_streak)
-        return max_habit
+        return load_habit_with_longest_streak(db_path=db_path)
 
     def get_longest_streak_for_habit(habit_name: str, db_path: str = DEFAULT_DATABASE) -> Optional[int]:
         """
         Returns the longest streak for a specific habit.
         """
-        habits = load_habits(db_path=db_path)
-        for habit in habits:
-            if habit.name.lower() == habit_name.lower():
-                return habit.longest_streak
-        return None
+        return load_longest_streak(habit_name, db_path=db_path)
@@ -0,0 +1,109 @@
+# backup.py
+
+import csv
+import logging
+import sqlite3
+from typing import Optional, Tuple
+from model import COMPLETE_EVENT
+from database import get_connection, append_completion_events, compact_events, valid_event, DEFAULT_DATABASE
+import logs
+import queries
+
+logger = logs.get_logger("backup")
+
+# Pages copied per backup step. Between two steps the source database is unlocked
+# for `sleep` seconds, so writers are not blocked for the whole copy.
+DEFAULT_PAGES_PER_STEP = 256
+DEFAULT_SLEEP = 0.005
+
+
+def backup_database(target_path: str, db_path: str = DEFAULT_DATABASE,
+                    pages: int = DEFAULT_PAGES_PER_STEP, sleep: float = DEFAULT_SLEEP):
+    """
+    Creates a consistent snapshot of the database at `target_path` while the app keeps running.
+    Uses sqlite3's online backup API and copies `pages` pages per step.
+    """
+    def progress(status, remaining, total):
+        logs.event(logger, logging.DEBUG, "backup_progress",
+                   "Backup of {db_path}: {copied}/{total} pages copied.",
+                   db_path=db_path, copied=total - remaining, total=total)
+
+    source = get_connection(db_path)
+    target = sqlite3.connect(target_path)
+    try:
+        with target:
+            source.backup(target, pages=pages, progress=progress, sleep=sleep)
+    finally:
+        target.close()
+    logs.event(logger, logging.INFO, "backup_created",
+               "Backup of {db_path} written to {target}.", db_path=db_path, target=target_path)
+
+
+def export_completions(output_path: str, since: Optional[int] = None,
+                       db_path: str = DEFAULT_DATABASE) -> Tuple[int, int]:
+    """
+    Writes the completion events after the watermark `since` (an event id) as CSV rows
+    (name, completion_date, action), including undos and completions of past days recorded since then.
+    Only the events after the watermark are read.
+    Without `since` the completed dates of all habits plus the not yet compacted events are exported.
+    Returns the number of exported rows and the watermark to pass to the next export.
+    Raises ValueError if events after `since` have already been pruned.
+    """
+    count = 0
+    with get_connection(db_path) as conn:
+        c = conn.cursor()
+        # One read transaction, so the habits and the events are exported from the same state
+        c.execute(queries.BEGIN_READ)
+        try:
+            c.execute(queries.SELECT_EVENT_LOG_STATE)
+            compacted_id, pruned_id = c.fetchone()
+            if since is not None and since < pruned_id:
+                raise ValueError(f"Events up to {pruned_id} have been pruned, an export since {since} "
+                                 "would be incomplete. Export without a watermark instead.")
+            watermark = compacted_id if since is None else since
+            with open(output_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["name", "completion_date", "action"])
+                if since is None:
+                    c.execute(queries.SELECT_COMPLETED_DATES)
+                    for name, completed_dates in c.fetchall():
+                        if completed_dates:
+                            for completion_date in completed_dates.split(","):
+                                writer.writerow([name, completion_date, COMPLETE_EVENT])
+                                count += 1
+                c.execute(queries.SELECT_EVENTS_AFTER, (watermark,))
+                for event_id, name, completion_date, action in c:
+                    writer.writerow([name, completion_date, action])
+                    watermark = event_id
+                    count += 1
+        finally:
+            conn.commit()
+    logs.event(logger, logging.INFO, "completions_exported",
+               "{count} completions since event {since} exported from {db_path} to {output}.",
+               count=count, since=since if since is not None else "0", db_path=db_path, output=output_path)
+    return count, watermark
+
+
+def apply_completions(input_path: str, db_path: str = DEFAULT_DATABASE) -> int:
+    """
+    Applies the completions and undos of an export created by export_completions to a database,
+    e.g. a restored snapshot. They are appended to the event log like any other event, so processes using
+    the database at the same time keep their completions. Events the database already has change nothing.
+    Rows with an invalid date or action are skipped. Returns the number of events applied.
+    """
+    events = []
+    with open(input_path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            if valid_event(row.get("completion_date"), row.get("action")):
+                events.append((row["name"], row["completion_date"], row["action"]))
+            else:
+                logs.event(logger, logging.WARNING, "invalid_row",
+                           "Line {line} of {input} skipped: invalid date or action.", line=line, input=input_path)
+
+    if not events or not append_completion_events(events, db_path):
+        return 0
+    compact_events(db_path)
+    logs.event(logger, logging.INFO, "completions_applied",
+               "{count} completions from {input} applied to {db_path}.",
+               count=len(events), input=input_path, db_path=db_path)
+    return len(events)
@@ -0,0 +1,48 @@
+# compaction.py
+
+import logging
+import threading
+import model  # noqa: F401  database imports from model, so model has to be loaded first
+from database import compact_events, COMPACTION_BATCH_SIZE, DEFAULT_DATABASE
+import logs
+
+logger = logs.get_logger("compaction")
+
+DEFAULT_INTERVAL = 5.0  # seconds between two compaction runs
+
+
+class Compactor(threading.Thread):
+    """
+    Background thread that periodically folds the completion event log into the habits.
+    1. run -> Compacts every `interval` seconds until stopped.
+    2. stop -> Stops the thread after a final compaction.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DATABASE, interval: float = DEFAULT_INTERVAL,
+                 batch_size: int = COMPACTION_BATCH_SIZE):
+        super().__init__(name="habit-compactor", daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        """Compacts every `interval` seconds until stopped."""
+        while not self._stopped.wait(self.interval):
+            self._compact()
+        self._compact()
+        logs.event(logger, logging.DEBUG, "compactor_stopped",
+                   "Compactor for {db_path} stopped.", db_path=self.db_path)
+
+    def _compact(self):
+        """Runs one compaction. Errors are logged so that the thread keeps running."""
+        try:
+            compact_events(self.db_path, self.batch_size)
+        except Exception as e:
+            logs.event(logger, logging.ERROR, "compaction_failed",
+                       "Compaction of {db_path} failed: {error}", db_path=self.db_path, error=e)
+
+    def stop(self, timeout: float = None):
+        """Stops the thread after a final compaction and waits for it to finish."""
+        self._stopped.set()
+        self.join(timeout)
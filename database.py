@@ -1,38 +1,135 @@
 # database.py
 import sqlite3
-from typing import List
+import logging
+import threading
+from typing import List, Optional, Tuple
 from datetime import timedelta, datetime
-from model import Habit
+from model import Habit, COMPLETE_EVENT, UNDO_EVENT
+import profiling
+import streaks
+import logs
+import queries
 
 DEFAULT_DATABASE = 'main.db'
 
+# Number of completion events folded per compaction transaction
+COMPACTION_BATCH_SIZE = 1000
+
+logger = logs.get_logger("database")
+
+# Open connections of the current thread by (db_path, connection class)
+_connections = threading.local()
+
+# Whether the name search indexes exist, by db_path. They need SQLite's FTS5 extension with the trigram tokenizer
+# (SQLite 3.34 or newer); without them the search falls back to names starting with the search term.
+_search_index = {}
+
 def get_connection(db_path: str = DEFAULT_DATABASE):
 
-    """Establishes a connection to the specified database.
+    """Returns a connection to the specified database.
+    Connections are opened once per thread and database and then reused, so sqlite3's
+    per connection statement cache keeps the statements of queries.py prepared between calls.
     Also accepts URIs to support in memmory database"""
-    if db_path.startswith("file:") and "?mode=memory" in db_path:
-        return sqlite3.connect(db_path, uri=True)
-    else:
-        return sqlite3.connect(db_path)
+    factory = profiling.connection_factory()
+    cache = _connections.__dict__.setdefault("by_path", {})
+    conn = cache.get((db_path, factory))
+    if conn is None:
+        with profiling.timed("db.connect"):
+            if db_path.startswith("file:") and "?mode=memory" in db_path:
+                conn = sqlite3.connect(db_path, uri=True, factory=factory)
+            else:
+                conn = sqlite3.connect(db_path, factory=factory)
+        cache[(db_path, factory)] = conn
+    return conn
+
+def close_connections():
+    """Closes the connections opened by the current thread, e.g. before a database file is replaced."""
+    cache = _connections.__dict__.setdefault("by_path", {})
+    for conn in cache.values():
+        conn.close()
+    cache.clear()
 
 
 def create_table(db_path: str = DEFAULT_DATABASE):
-    """Creates the 'habits' table if it does not exist."""
+    """Creates the 'habits', 'archived_habits' and 'completion_events' tables and their indexes if they do not exist."""
     with get_connection(db_path) as conn:
         c = conn.cursor()
-        c.execute("""CREATE TABLE IF NOT EXISTS habits(
-                  name TEXT UNIQUE,
-                  periodicity TEXT,
-                  creation_date TEXT,
-                  completed_dates TEXT,  
-                  goal_streak INTEGER,
-                  status INTEGER,
-                  position INTEGER,
-                  longest_streak INTEGER,
-                  target_per_week INTEGER
-                  )""")
+        c.execute(queries.CREATE_HABITS_TABLE)
+        c.execute(queries.HABITS_TABLE_HAS_ID)
+        if not c.fetchone()[0]:
+            c.execute(queries.BEGIN_IMMEDIATE)
+            for statement in queries.MIGRATE_HABITS_TABLE:
+                c.execute(statement)
+            conn.commit()
+        c.execute(queries.CREATE_ARCHIVED_HABITS_TABLE)
+        c.execute(queries.CREATE_COMPLETION_EVENTS_TABLE)
+        c.execute(queries.CREATE_EVENT_LOG_STATE_TABLE)
+        c.execute(queries.CREATE_STREAK_RUNS_TABLE)
+        c.execute(queries.CREATE_STREAK_RUNS_TRIGGER)
+        c.execute(queries.INIT_EVENT_LOG_STATE)
+        for statement in queries.DROP_OBSOLETE_INDEXES + queries.CREATE_INDEXES:
+            c.execute(statement)
         conn.commit()
-    print(f"Table 'habits' created or already exists in {db_path}.")
+        _search_index[db_path] = _create_search_index(conn)
+    logs.event(logger, logging.DEBUG, "table_created",
+               "Table 'habits' created or already exists in {db_path}.", db_path=db_path)
+
+def _create_search_index(conn: sqlite3.Connection) -> bool:
+    """Creates the name search indexes and their triggers if possible. Returns False if SQLite does not support them."""
+    c = conn.cursor()
+    c.execute(queries.COUNT_SEARCH_TABLES)
+    search_tables_missing = c.fetchone()[0] < len(queries.CREATE_SEARCH_TABLES)
+    try:
+        c.execute(queries.BEGIN_IMMEDIATE)
+        for statement in queries.CREATE_SEARCH_TABLES + queries.CREATE_SEARCH_TRIGGERS:
+            c.execute(statement)
+        if search_tables_missing:
+            for statement in queries.REBUILD_SEARCH_INDEXES:
+                c.execute(statement)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        logs.event(logger, logging.WARNING, "search_index_unavailable",
+                   "Name search index not available ({error}), only names starting with the search term are found.",
+                   error=e)
+        return False
+    return True
+
+def has_search_index(db_path: str = DEFAULT_DATABASE) -> bool:
+    """Checks if the name search indexes exist in the specified database."""
+    if db_path not in _search_index:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.execute(queries.COUNT_SEARCH_TABLES)
+            _search_index[db_path] = c.fetchone()[0] == len(queries.CREATE_SEARCH_TABLES)
+    return _search_index[db_path]
+
+def _habit_from_row(row: tuple) -> Habit:
+    """Creates a Habit from a row selected with queries.HABIT_COLUMNS."""
+    return Habit(
+        name=row[0],
+        periodicity=row[1],
+        creation_date=row[2],
+        completed_dates=row[3].split(',') if row[3] else [],
+        goal_streak=row[4],
+        status=row[5],
+        position=row[6],
+        longest_streak=row[7],
+        target_per_week=row[8]
+    )
+
+def _update_params(habit: Habit) -> tuple:
+    """Returns the parameters of queries.UPDATE_HABIT for a habit."""
+    completed_dates_str = ",".join(habit.completed_dates) if habit.completed_dates else ""
+    return (habit.periodicity,
+            habit.creation_date,
+            completed_dates_str,
+            habit.goal_streak,
+            habit.status,
+            habit.position,
+            habit.longest_streak,
+            habit.target_per_week,
+            habit.name)
 
 def save_habit(habit: Habit, db_path: str = DEFAULT_DATABASE):
     """Saves habit to the specified database."""
@@ -40,55 +137,315 @@ def save_habit(habit: Habit, db_path: str = DEFAULT_DATABASE):
     try:
         with get_connection(db_path) as conn:
             c = conn.cursor()
-            c.execute('SELECT COUNT(*) FROM habits')
-            count = c.fetchone()[0]
-            habit.position = count if count else 0
+            c.execute(queries.SELECT_NEXT_POSITION)
+            habit.position = c.fetchone()[0]
             completed_dates_str = ",".join(habit.completed_dates) if habit.completed_dates else ""
-            c.execute('''
-                INSERT INTO habits (name, periodicity, creation_date, completed_dates, goal_streak, status, position, longest_streak, target_per_week)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (habit.name, 
-                  habit.periodicity, 
-                  habit.creation_date, 
-                  completed_dates_str, 
-                  habit.goal_streak, 
-                  habit.status, 
-                  habit.position,
-                  habit.longest_streak,
-                  habit.target_per_week))
+            c.execute(queries.INSERT_HABIT,
+                      (habit.name,
+                       habit.periodicity,
+                       habit.creation_date,
+                       completed_dates_str,
+                       habit.goal_streak,
+                       habit.status,
+                       habit.position,
+                       habit.longest_streak,
+                       habit.target_per_week))
             conn.commit()
-        print(f"Habit '{habit.name}' successfully saved to {db_path}.")
+        logs.event(logger, logging.INFO, "habit_saved",
+                   "Habit '{habit}' successfully saved to {db_path}.", habit=habit.name, db_path=db_path)
     except sqlite3.IntegrityError:
-        print(f"Habit with name '{habit.name}' already exists in {db_path}.")
+        logs.event(logger, logging.WARNING, "habit_exists",
+                   "Habit with name '{habit}' already exists in {db_path}.", habit=habit.name, db_path=db_path)
     except sqlite3.Error as e:
-        print(f"An error occurred in {db_path}: {e}")
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
 
-def load_habits(db_path: str = DEFAULT_DATABASE) -> List[Habit]:
-    """Loads all habits from the specified database."""
+def _load(sql: str, params: tuple, db_path: str) -> List[Habit]:
+    """Loads the habits selected by `sql` from the specified database."""
 
     habits = []
     try:
         with get_connection(db_path) as conn:
             c = conn.cursor()
-            c.execute('SELECT * FROM habits')
-            results = c.fetchall()
-            for result in results:
-                habit = Habit(
-                    name=result[0],
-                    periodicity=result[1],
-                    creation_date=result[2],
-                    completed_dates=result[3].split(',') if result[3] else [],
-                    goal_streak=result[4],
-                    status=result[5],
-                    position=result[6],
-                    longest_streak=result[7],  
-                    target_per_week=result[8] 
-                )
-                habits.append(habit)
+            c.execute(sql, params)
+            habits = [_habit_from_row(row) for row in c.fetchall()]
     except sqlite3.Error as e:
-        print(f"An error occurred in {db_path}: {e}")
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
     return habits
 
+def load_habits(db_path: str = DEFAULT_DATABASE) -> List[Habit]:
+    """Loads all habits from the specified database."""
+    return _load(queries.SELECT_ALL_HABITS, (), db_path)
+
+def load_habit(name: str, db_path: str = DEFAULT_DATABASE) -> Optional[Habit]:
+    """Loads a single habit by its name (case-insensitive). Returns None if it does not exist."""
+    habits = _load(queries.SELECT_HABIT_BY_NAME, (name, name), db_path)
+    return habits[0] if habits else None
+
+def _load_names(sql: str, params: tuple, db_path: str) -> List[str]:
+    """Loads the habit names selected by `sql` from the specified database."""
+
+    names = []
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.execute(sql, params)
+            names = [row[0] for row in c.fetchall()]
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+    return names
+
+def search_habit_names_by_prefix(prefix: str, limit: int, db_path: str = DEFAULT_DATABASE) -> List[str]:
+    """Loads up to `limit` habit names starting with `prefix` (case-insensitive), in alphabetical order."""
+    # Every name starting with the prefix sorts below prefix + the largest code point.
+    return _load_names(queries.SEARCH_HABIT_NAMES_BY_RANGE, (prefix, prefix + "\U0010ffff", limit), db_path)
+
+def _fts_string(text: str) -> str:
+    """Quotes text as an FTS5 string, so it is matched literally."""
+    return '"' + text.replace('"', '""') + '"'
+
+def search_habit_names_by_substring(term: str, limit: int, db_path: str = DEFAULT_DATABASE) -> List[str]:
+    """
+    Loads up to `limit` habit names containing `term` (case-insensitive) from the trigram index.
+    The term needs at least 3 characters, shorter terms find nothing. Finds nothing without the search index.
+    """
+    if not has_search_index(db_path):
+        return []
+    return _load_names(queries.SEARCH_HABIT_NAMES_BY_TRIGRAMS, (_fts_string(term), limit), db_path)
+
+def search_habit_names_by_word_prefix(prefix: str, limit: int, db_path: str = DEFAULT_DATABASE) -> List[str]:
+    """Loads up to `limit` habit names with a word starting with `prefix` (case-insensitive)."""
+    if not has_search_index(db_path):
+        return []
+    return _load_names(queries.SEARCH_HABIT_NAMES_BY_WORDS, (_fts_string(prefix) + "*", limit), db_path)
+
+def search_similar_habit_names(term: str, limit: int, db_path: str = DEFAULT_DATABASE) -> List[str]:
+    """Loads up to `limit` habit names sharing trigrams with `term`, the names sharing the most first."""
+    trigrams = dict.fromkeys(term[i:i + 3] for i in range(len(term) - 2))
+    if not trigrams or not has_search_index(db_path):
+        return []
+    match = " OR ".join(_fts_string(trigram) for trigram in trigrams)
+    return _load_names(queries.SEARCH_SIMILAR_HABIT_NAMES, (match, limit), db_path)
+
+def insert_habits(conn: sqlite3.Connection, rows: List[tuple]):
+    """
+    Inserts many habit rows (in queries.HABIT_COLUMNS order) in one transaction and commits.
+    The search indexes are updated once for all new rows instead of row by row.
+    """
+    c = conn.cursor()
+    c.execute(queries.BEGIN_IMMEDIATE)
+    try:
+        c.execute(queries.COUNT_SEARCH_TABLES)
+        indexed = c.fetchone()[0] == len(queries.CREATE_SEARCH_TABLES)
+        c.execute(queries.SELECT_MAX_HABIT_ROWID)
+        last_rowid = c.fetchone()[0]
+        c.execute(queries.DROP_SEARCH_INSERT_TRIGGER)
+        c.executemany(queries.INSERT_HABIT, rows)
+        if indexed:
+            for statement in queries.INDEX_NEW_HABIT_NAMES:
+                c.execute(statement, (last_rowid,))
+            c.execute(queries.CREATE_SEARCH_INSERT_TRIGGER)
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def load_habits_by_periodicity(periodicity: str, db_path: str = DEFAULT_DATABASE) -> List[Habit]:
+    """Loads all habits with a specific periodicity (case-insensitive)."""
+    return _load(queries.SELECT_HABITS_BY_PERIODICITY, (periodicity,), db_path)
+
+def load_habits_by_status(status: int, db_path: str = DEFAULT_DATABASE) -> List[Habit]:
+    """Loads all habits with a specific status."""
+    return _load(queries.SELECT_HABITS_BY_STATUS, (status,), db_path)
+
+def load_archived_habits(db_path: str = DEFAULT_DATABASE) -> List[Habit]:
+    """Loads all archived habits, oldest archived first."""
+    return _load(queries.SELECT_ARCHIVED_HABITS, (), db_path)
+
+def load_habit_with_longest_streak(db_path: str = DEFAULT_DATABASE) -> Optional[Habit]:
+    """Loads the habit with the longest streak. On ties the habit created first wins."""
+    habits = _load(queries.SELECT_HABIT_WITH_LONGEST_STREAK, (), db_path)
+    return habits[0] if habits else None
+
+def load_longest_streak(name: str, db_path: str = DEFAULT_DATABASE) -> Optional[int]:
+    """Loads only the longest streak of a habit by its name (case-insensitive)."""
+
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.execute(queries.SELECT_LONGEST_STREAK_BY_NAME, (name, name))
+            row = c.fetchone()
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+        return None
+    return row[0] if row else None
+
+
+
+def valid_event(completion_date: str, action: str) -> bool:
+    """Checks that an event has a YYYY-MM-DD date and a known action ('complete' or 'undo')."""
+    if action not in (COMPLETE_EVENT, UNDO_EVENT):
+        return False
+    try:
+        datetime.strptime(completion_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def _log_invalid_event(name: str, completion_date: str, action: str, db_path: str):
+    logs.event(logger, logging.WARNING, "invalid_event",
+               "Invalid completion event ({action} on '{date}') of habit '{habit}' not applied in {db_path}.",
+               habit=name, date=completion_date, action=action, db_path=db_path)
+
+def append_completion_event(name: str, completion_date: str, action: str, db_path: str = DEFAULT_DATABASE) -> bool:
+    """
+    Appends a completion event ('complete' or 'undo') to the event log.
+    Writers only ever insert, so concurrent writers cannot overwrite each other's completions.
+    Invalid events (see valid_event) are not appended. Returns False if nothing was appended.
+    """
+    if not valid_event(completion_date, action):
+        _log_invalid_event(name, completion_date, action, db_path)
+        return False
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.execute(queries.INSERT_COMPLETION_EVENT, (name, completion_date, action, datetime.now().isoformat()))
+            conn.commit()
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+        return False
+    return True
+
+def append_completion_events(events: List[Tuple[str, str, str]], db_path: str = DEFAULT_DATABASE) -> bool:
+    """
+    Appends many completion events (name, completion_date, action) to the event log in one transaction.
+    If one of the events is invalid (see valid_event), nothing is appended and False is returned.
+    """
+    for name, completion_date, action in events:
+        if not valid_event(completion_date, action):
+            _log_invalid_event(name, completion_date, action, db_path)
+            return False
+    recorded_at = datetime.now().isoformat()
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.executemany(queries.INSERT_COMPLETION_EVENT,
+                          [(name, completion_date, action, recorded_at) for name, completion_date, action in events])
+            conn.commit()
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+        return False
+    return True
+
+def load_pending_events(name: str, db_path: str = DEFAULT_DATABASE) -> List[Tuple[str, str]]:
+    """Loads the not yet compacted events of a habit as (completion_date, action), oldest first."""
+
+    events = []
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.execute(queries.SELECT_PENDING_EVENTS_FOR_HABIT, (name,))
+            events = c.fetchall()
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+    return events
+
+def compact_events(db_path: str = DEFAULT_DATABASE, batch_size: int = COMPACTION_BATCH_SIZE) -> int:
+    """
+    Folds the pending completion events into the habits (completed dates and longest streak).
+    The longest streak is kept up to date through the stored streak runs, so only the runs next to each event
+    are read and written. The events stay in the log until they are pruned. Every batch is one short write transaction,
+    so processes appending events are only blocked briefly. Returns the number of folded events.
+    """
+    folded = 0
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            while True:
+                c.execute(queries.BEGIN_IMMEDIATE)
+                c.execute(queries.SELECT_EVENT_LOG_STATE)
+                last_id = c.fetchone()[0]
+                c.execute(queries.SELECT_PENDING_EVENTS, (last_id, batch_size))
+                events = c.fetchall()
+                if not events:
+                    conn.commit()
+                    break
+                # Group the events by the habit row they resolve to, not by the lower case name,
+                # so "Read" and "read" stay separate habits.
+                rowids = {}
+                events_by_habit = {}
+                dropped = {}
+                for _, name, completion_date, action in events:
+                    if name not in rowids:
+                        c.execute(queries.SELECT_HABIT_ROWID_BY_NAME, (name, name))
+                        row = c.fetchone()
+                        rowids[name] = row[0] if row else None
+                    if rowids[name] is None:
+                        dropped[name] = dropped.get(name, 0) + 1
+                    else:
+                        events_by_habit.setdefault(rowids[name], []).append((completion_date, action))
+                for name, count in dropped.items():
+                    logs.event(logger, logging.WARNING, "events_dropped",
+                               "{count} events of unknown habit '{habit}' dropped in {db_path}.",
+                               count=count, habit=name, db_path=db_path)
+                for rowid, habit_events in events_by_habit.items():
+                    c.execute(queries.SELECT_HABIT_BY_ROWID, (rowid,))
+                    habit = _habit_from_row(c.fetchone())
+                    streaks.ensure(c, habit.name, habit.periodicity, habit.completed_dates)
+                    step = streaks.step(habit.periodicity)
+                    for completion_date, action in habit_events:
+                        # Events written before they were validated must not block the compaction
+                        if not valid_event(completion_date, action):
+                            _log_invalid_event(habit.name, completion_date, action, db_path)
+                        elif action == COMPLETE_EVENT:
+                            if streaks.add(c, habit.name, step, streaks.day(completion_date)):
+                                habit.completed_dates.append(completion_date)
+                        elif streaks.remove(c, habit.name, step, streaks.day(completion_date)):
+                            habit.completed_dates.remove(completion_date)
+                    habit.longest_streak = streaks.longest(c, habit.name)
+                    c.execute(queries.UPDATE_HABIT, _update_params(habit))
+                c.execute(queries.UPDATE_COMPACTED_ID, (events[-1][0],))
+                conn.commit()
+                folded += len(events)
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+    if folded:
+        logs.event(logger, logging.DEBUG, "events_compacted",
+                   "{count} completion events compacted in {db_path}.", count=folded, db_path=db_path)
+    return folded
+
+def prune_events(up_to_id: int, db_path: str = DEFAULT_DATABASE) -> int:
+    """
+    Removes the compacted events with an id up to `up_to_id` from the log, e.g. the watermark of an export
+    that has been stored safely. Pending events are never removed. Returns the number of removed events.
+    """
+    removed = 0
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            c.execute(queries.BEGIN_IMMEDIATE)
+            c.execute(queries.SELECT_EVENT_LOG_STATE)
+            compacted_id, pruned_id = c.fetchone()
+            up_to_id = min(up_to_id, compacted_id)
+            if up_to_id > pruned_id:
+                c.execute(queries.DELETE_EVENTS_UP_TO, (up_to_id,))
+                removed = c.rowcount
+                c.execute(queries.UPDATE_PRUNED_ID, (up_to_id,))
+            conn.commit()
+    except sqlite3.Error as e:
+        logs.event(logger, logging.ERROR, "db_error",
+                   "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+    if removed:
+        logs.event(logger, logging.DEBUG, "events_pruned",
+                   "{count} completion events pruned in {db_path}.", count=removed, db_path=db_path)
+    return removed
 
 
 def add_predefined_habits(db_path: str = DEFAULT_DATABASE):
@@ -166,4 +523,5 @@ def add_predefined_habits(db_path: str = DEFAULT_DATABASE):
             target_per_week=habit_data["target_per_week"]
         )
         save_habit(habit, db_path)
-    print(f"Predefined habits have been added to {db_path}.")
+    logs.event(logger, logging.INFO, "predefined_habits_added",
+               "Predefined habits have been added to {db_path}.", db_path=db_path)
@@ -0,0 +1,43 @@
+# logs.py
+
+import logging
+
+LOGGER_NAME = "habit_tracker"
+
+# Silent by default: library users only see messages after calling enable()
+# or configuring the 'habit_tracker' logger themselves.
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns the logger for a module, e.g. get_logger('database') -> 'habit_tracker.database'."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def event(logger: logging.Logger, level: int, event_name: str, message: str, **fields):
+    """
+    Emits a structured event. The message is only formatted if the level is enabled,
+    so disabled events cost a single level check.
+    The event name and fields are attached to the record as `record.event` and `record.fields`.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message.format(**fields), extra={"event": event_name, "fields": fields})
+
+
+def enable(level: int = logging.INFO, handler: logging.Handler = None) -> logging.Handler:
+    """
+    Turns on output of the 'habit_tracker' logger with the given level.
+    Uses a plain stderr handler unless another handler is passed. Returns the attached handler.
+    """
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+def disable(handler: logging.Handler):
+    """Removes a handler previously attached with enable()."""
+    logging.getLogger(LOGGER_NAME).removeHandler(handler)
@@ -6,10 +6,33 @@ import questionary
 from model import HabitManager
 from analytics import Analytics
 import database
+import backup
+import profiling
+import logs
+import argparse
+import logging
 from datetime import datetime
 
 console = Console()
 
+# Maximum number of habits shown in a habit picker
+PICKER_LIMIT = 20
+
+class ConsoleHandler(logging.Handler):
+    """
+    Shows the messages of the data layer (saved, deleted, not found, errors) on the console.
+    """
+    STYLES = {
+        logging.DEBUG: "dim",
+        logging.INFO: "green",
+        logging.WARNING: "bold yellow",
+        logging.ERROR: "bold red",
+    }
+
+    def emit(self, record: logging.LogRecord):
+        style = self.STYLES.get(record.levelno, "bold red")
+        console.print(record.getMessage(), style=style, markup=False)
+
 def display_habits(habits: list):
     """
     Displays all habits in a table with the following columns: 
@@ -62,6 +85,27 @@ def display_habits(habits: list):
         
         console.print(table)
 
+def select_habit(message: str):
+    """
+    Asks for (part of) a habit name and lets the user pick one of the matching habits.
+    Only the best PICKER_LIMIT matches are shown. Returns None if nothing was found or the user cancelled.
+    """
+    query = questionary.text(
+        "Search habit by name (leave empty to show the first habits):"
+    ).ask()
+    if query is None:
+        return None
+    habit_names = HabitManager.search_habit_names(query.strip(), limit=PICKER_LIMIT)
+    if not habit_names:
+        console.print(f"No habits matching '{query.strip()}' found.", style="bold yellow")
+        return None
+    habit_names.append("Cancel")
+    selected_habit = questionary.select(message, choices=habit_names).ask()
+    if selected_habit in (None, "Cancel"):
+        console.print("Operation cancelled.", style="bold yellow")
+        return None
+    return selected_habit
+
 def display_status_overview():
     """
     Displays a status (green, yellow, red) overview of habits. Habits are grouped by status.
@@ -80,10 +124,66 @@ def display_status_overview():
         
         console.print(table)
 
+def display_stats():
+    """
+    Displays the collected timings per operation (database calls, HabitManager and Analytics methods)
+    together with a latency histogram and the number of rows read/written.
+    """
+    if not profiling.is_enabled():
+        console.print("Instrumentation is disabled. Start the app with --stats or --profile to collect timings.", style="bold yellow")
+        return
+    stats = profiling.get_stats()
+    if not stats["operations"]:
+        console.print("No operations recorded yet.", style="bold yellow")
+        return
+
+    table = Table(title="Performance Stats", show_lines=True)
+    table.add_column("Operation", style="cyan", no_wrap=True)
+    table.add_column("Calls", justify="right")
+    table.add_column("Total (ms)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+    table.add_column("Histogram", style="dim")
+
+    for name, op in stats["operations"].items():
+        histogram = ", ".join(f"{label}: {count}" for label, count in op["histogram"].items() if count)
+        table.add_row(
+            name,
+            str(op["calls"]),
+            f"{op['total_ms']:.2f}",
+            f"{op['mean_ms']:.3f}",
+            f"{op['max_ms']:.3f}",
+            histogram
+        )
+
+    console.print(table)
+    console.print(f"Rows read: [bold blue]{stats['rows_read']}[/bold blue], rows written: [bold blue]{stats['rows_written']}[/bold blue]\n")
+
+def parse_args(argv=None):
+    """
+    Parses the command line options:
+    --stats -> Collects per operation timings, shown in the "Show performance stats" screen.
+    --profile FILE -> Additionally captures a cProfile of the whole session and writes it to FILE on exit.
+    --log-level LEVEL -> Minimum level of the messages shown (DEBUG, INFO, WARNING, ERROR). Default is INFO.
+    --backup FILE -> Writes a snapshot of the database to FILE and exits.
+    --export-completions FILE -> Writes the completions (optionally only the changes since --since EVENT_ID) to FILE and exits.
+    """
+    parser = argparse.ArgumentParser(description="Habit Tracker")
+    parser.add_argument("--stats", action="store_true", help="collect per operation timings")
+    parser.add_argument("--profile", metavar="FILE", help="write a cProfile capture of the session to FILE")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="minimum level of the messages shown")
+    parser.add_argument("--backup", metavar="FILE", help="write a snapshot of the database to FILE and exit")
+    parser.add_argument("--export-completions", metavar="FILE",
+                        help="write the completions as CSV to FILE and exit")
+    parser.add_argument("--since", metavar="EVENT_ID", type=int,
+                        help="only export completions and undos recorded after the watermark of the last export")
+    return parser.parse_args(argv)
+
 def main():
     """
     Main menu for the habit tracker. Navigation is guided with questionary. The user is able to abort every step.
-    The menu has 10 predefined options. Some options are multi steps like creating a new habit.
+    The menu has 13 predefined options. Some options are multi steps like creating a new habit.
                 "1. List All Habits",
                 "2. List Habits by Periodicity",
                 "3. Mark Habit as Completed",
@@ -93,7 +193,10 @@ def main():
                 "7. Create New Habit",
                 "8. Delete Habit",
                 "9. Add Predefined Habits",
-                "10. Exit"
+                "10. Show Performance Stats",
+                "11. Restore Archived Habit",
+                "12. Undo Habit Completion",
+                "13. Exit"
     """
     database.create_table()
 
@@ -110,7 +213,10 @@ def main():
                 "7. Create new habit",
                 "8. Delete habit",
                 "9. Add predefined habits",
-                "10. Exit"
+                "10. Show performance stats",
+                "11. Restore archived habit",
+                "12. Undo habit completion",
+                "13. Exit"
             ]
         ).ask()
 
@@ -138,18 +244,8 @@ def main():
 
             # 3. Mark habit as completed
             elif choice == "3. Mark habit as completed":
-                habits = HabitManager.get_all_habits()
-                if not habits:
-                    console.print("No habits available to mark as completed.", style="bold yellow")
-                    continue
-                habit_names = [habit.name for habit in habits]
-                habit_names.append("Cancel")
-                selected_habit = questionary.select(
-                    "Select the habit to mark as completed:",
-                    choices=habit_names
-                ).ask()
-                if selected_habit == "Cancel":
-                    console.print("Operation cancelled.", style="bold yellow")
+                selected_habit = select_habit("Select the habit to mark as completed:")
+                if selected_habit is None:
                     continue
                 HabitManager.mark_habit_completed(selected_habit)
 
@@ -163,18 +259,8 @@ def main():
 
             # 5. Find Longest Streak for a Specific Habit
             elif choice == "5. Find longest streak for a specific habit":
-                habits = HabitManager.get_all_habits()
-                if not habits:
-                    console.print("No habits available.", style="bold yellow")
-                    continue
-                habit_names = [habit.name for habit in habits]
-                habit_names.append("Cancel")
-                selected_habit = questionary.select(
-                    "Select the habit to find its longest streak:",
-                    choices=habit_names
-                ).ask()
-                if selected_habit == "Cancel":
-                    console.print("Operation cancelled.", style="bold yellow")
+                selected_habit = select_habit("Select the habit to find its longest streak:")
+                if selected_habit is None:
                     continue
                 longest_streak = Analytics.get_longest_streak_for_habit(selected_habit)
                 if longest_streak is not None:
@@ -231,20 +317,19 @@ def main():
             # 8. Delete habit
             elif choice == "8. Delete habit":
                 try:
-                    habits = HabitManager.get_all_habits()
-                    if not habits:
-                        console.print("No habits available to delete.", style="bold yellow")
+                    selected_habit = select_habit("Select the habit to delete:")
+                    if selected_habit is None:
                         continue
-                    habit_names = [habit.name for habit in habits]
-                    habit_names.append("Cancel")
-                    selected_habit = questionary.select(
-                        "Select the habit to delete:",
-                        choices=habit_names
+                    mode = questionary.select(
+                        f"Archive '{selected_habit}' (keeps its history) or delete it permanently?",
+                        choices=["Archive", "Delete permanently", "Cancel"]
                     ).ask()
-                    if selected_habit == "Cancel":
+                    if mode == "Archive":
+                        HabitManager.archive_habit(selected_habit)
+                    elif mode == "Delete permanently":
+                        HabitManager.delete_habit(selected_habit)
+                    else:
                         console.print("Operation cancelled.", style="bold yellow")
-                        continue
-                    HabitManager.delete_habit(selected_habit)
                 except KeyboardInterrupt:
                     console.print("\nOperation aborted by user.", style="bold yellow")
 
@@ -258,8 +343,49 @@ def main():
                 else:
                     console.print("Predefined habits were not added.", style="bold yellow")
 
-            # 10. Exit
-            elif choice == "10. Exit":
+            # 10. Show performance stats
+            elif choice == "10. Show performance stats":
+                display_stats()
+
+            # 11. Restore archived habit
+            elif choice == "11. Restore archived habit":
+                habits = HabitManager.get_archived_habits()
+                if not habits:
+                    console.print("No archived habits available.", style="bold yellow")
+                    continue
+                habit_names = [habit.name for habit in habits]
+                habit_names.append("Cancel")
+                selected_habit = questionary.select(
+                    "Select the habit to restore:",
+                    choices=habit_names
+                ).ask()
+                if selected_habit == "Cancel":
+                    console.print("Operation cancelled.", style="bold yellow")
+                    continue
+                HabitManager.restore_habit(selected_habit)
+
+            # 12. Undo habit completion
+            elif choice == "12. Undo habit completion":
+                selected_habit = select_habit("Select the habit to undo a completion for:")
+                if selected_habit is None:
+                    continue
+                habit = HabitManager.replay_habit(selected_habit)
+                if not habit or not habit.completed_dates:
+                    console.print(f"Habit '{selected_habit}' has no completions.", style="bold yellow")
+                    continue
+                completed_dates = sorted(habit.completed_dates, reverse=True)[:PICKER_LIMIT]
+                completed_dates.append("Cancel")
+                selected_date = questionary.select(
+                    "Select the completion to remove:",
+                    choices=completed_dates
+                ).ask()
+                if selected_date in (None, "Cancel"):
+                    console.print("Operation cancelled.", style="bold yellow")
+                    continue
+                HabitManager.uncomplete_habit(selected_habit, selected_date)
+
+            # 13. Exit
+            elif choice == "13. Exit":
                 console.print("Exiting...", style="bold green")
                 break
 
@@ -271,4 +397,26 @@ def main():
             continue
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    logs.enable(getattr(logging, args.log_level), ConsoleHandler())
+    if args.backup or args.export_completions:
+        database.create_table()
+        if args.backup:
+            backup.backup_database(args.backup)
+        if args.export_completions:
+            try:
+                _, watermark = backup.export_completions(args.export_completions, since=args.since)
+                console.print(f"Use --since {watermark} for the next incremental export.", style="bold green")
+            except ValueError as e:
+                console.print(str(e), style="bold red")
+    else:
+        if args.stats or args.profile:
+            profiling.enable()
+        if args.profile:
+            profiling.start_profile()
+        try:
+            main()
+        finally:
+            if args.profile:
+                profiling.stop_profile(args.profile)
+                console.print(f"Profile written to {args.profile}.", style="bold green")
\ No newline at end of file
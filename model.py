@@ -1,7 +1,12 @@
 # model.py
 
-from typing import List
+from typing import List, Optional, Tuple
 from datetime import date, datetime, timedelta
+import difflib
+import logging
+import logs
+
+logger = logs.get_logger("model")
 
 
 # Status Constants
@@ -9,6 +14,10 @@ GREEN = 1    # Everything is on track
 YELLOW = 2   # One missed track
 RED = 3      # More than three missed tracks
 
+# Completion event actions
+COMPLETE_EVENT = "complete"
+UNDO_EVENT = "undo"
+
 
 class Habit:
     """
@@ -19,6 +28,8 @@ class Habit:
     4. update_longest_streak -> Calculates and updates the longest streak.
     5. get_streak -> Calculates the current streak based on completion dates.
     6. was_completed_on -> Checks if the habit was completed on a specific date.
+    7. uncomplete_task -> removes a completion date and updates the longest streak.
+    8. apply_events -> Applies completion events (complete/undo) and updates the longest streak once.
     """
     def __init__(self, name: str, periodicity: str, creation_date: str = None, 
                  completed_dates: List[str] = None, goal_streak: int = 0, 
@@ -32,6 +43,7 @@ class Habit:
         self.position = position
         self.longest_streak = longest_streak  # Longest streak in habit history
         self.target_per_week = target_per_week  
+
     def complete_task(self, completion_date: str = None):
         """
         Adds a completion date if it doesn't already exist. 
@@ -40,10 +52,12 @@ class Habit:
             completion_date = str(date.today())
         if completion_date not in self.completed_dates:
             self.completed_dates.append(completion_date)
-            print(f"Task completed on {completion_date}.")
+            logs.event(logger, logging.DEBUG, "task_completed",
+                       "Task completed on {date}.", habit=self.name, date=completion_date)
             self.update_longest_streak()
         else:
-            print(f"Task on {completion_date} has already been completed.")
+            logs.event(logger, logging.INFO, "task_already_completed",
+                       "Task on {date} has already been completed.", habit=self.name, date=completion_date)
 
     def get_total_completions(self) -> int:
         """Returns the total number of completions."""
@@ -113,25 +127,77 @@ class Habit:
                 break  
         return streak
 
-    def was_completed_on(self, check_date: str) -> bool:
-        """Checks if the habit was completed on a specific date."""
-        return check_date in self.completed_dates
+    def was_completed_on(self, check_date: str, pending_events: List[Tuple[str, str]] = ()) -> bool:
+        """
+        Checks if the habit was completed on a specific date.
+        Not yet compacted events (completion_date, action), oldest first, are taken into account.
+        """
+        completed = check_date in self.completed_dates
+        for completion_date, action in pending_events:
+            if completion_date == check_date:
+                completed = action == COMPLETE_EVENT
+        return completed
+
+    def uncomplete_task(self, completion_date: str) -> bool:
+        """
+        Removes a completion date, e.g. to correct a wrong date. Returns False if the date was not completed.
+        """
+        if completion_date not in self.completed_dates:
+            logs.event(logger, logging.INFO, "task_not_completed",
+                       "Task on {date} has not been completed.", habit=self.name, date=completion_date)
+            return False
+        self.completed_dates.remove(completion_date)
+        logs.event(logger, logging.DEBUG, "task_uncompleted",
+                   "Completion on {date} removed.", habit=self.name, date=completion_date)
+        self.update_longest_streak()
+        return True
+
+    def apply_events(self, events: List[Tuple[str, str]]):
+        """
+        Applies completion events given as (completion_date, action) in the order they were recorded.
+        'complete' adds the date if it is missing, 'undo' removes it. The longest streak is updated once at the end.
+        """
+        completed = dict.fromkeys(self.completed_dates)
+        for completion_date, action in events:
+            if action == COMPLETE_EVENT:
+                completed.setdefault(completion_date)
+            elif action == UNDO_EVENT:
+                completed.pop(completion_date, None)
+        self.completed_dates = list(completed)
+        self.update_longest_streak()
 
 ##############################################################################
 
-from database import load_habits, save_habit, get_connection, DEFAULT_DATABASE
+from database import (load_habits, load_habit, load_habits_by_periodicity, load_habits_by_status,
+                      load_archived_habits, search_habit_names_by_prefix, search_habit_names_by_substring,
+                      search_habit_names_by_word_prefix, search_similar_habit_names,
+                      save_habit, append_completion_event, load_pending_events, compact_events,
+                      get_connection, DEFAULT_DATABASE)
+import profiling
+import queries
 import sqlite3 
 
 # In model.py
 
+# Number of names sharing the most trigrams with the query that are compared when looking for similar names (typos).
+FUZZY_CANDIDATES = 100
+
+@profiling.instrument_class
 class HabitManager:
     """Manages habits including:
     1. create_habit -> Creates and saves a new habit.
     2. delete_habit -> Deletes a habit by its name.
-    3. get_all_habits -> Returns a list of all habits.
-    4. get_habits_by_periodicity -> Returns a list of habits with a specific periodicity.
-    5. mark_habit_completed -> Marks a habit as completed by adding a completion date.
-    6. get_status_text -> Returns the text representation of a given status.
+    3. archive_habit -> Moves a habit to the archive, keeping its history.
+    4. restore_habit -> Moves an archived habit back to the active habits.
+    5. get_all_habits -> Returns a list of all habits.
+    6. replay_habit -> Returns a habit with its pending completion events applied.
+    7. get_archived_habits -> Returns a list of all archived habits.
+    8. get_habits_by_periodicity -> Returns a list of habits with a specific periodicity.
+    9. get_habits_by_status -> Returns a list of habits with a specific status.
+    10. search_habit_names -> Returns habit names matching a search term for autocompletion.
+    11. mark_habit_completed -> Marks a habit as completed by adding a completion date.
+    12. uncomplete_habit -> Removes a completion date from a habit.
+    13. get_status_text -> Returns the text representation of a given status.
     """
 
     def create_habit(name: str, periodicity: str, goal_streak: int, target_per_week: int = 0, db_path: str = DEFAULT_DATABASE):
@@ -139,25 +205,93 @@ class HabitManager:
         habit = Habit(name=name, periodicity=periodicity, goal_streak=goal_streak, target_per_week=target_per_week)
         save_habit(habit, db_path)
 
-    def delete_habit(name: str, db_path: str = DEFAULT_DATABASE):
-        """Deletes a habit by its name."""
-        habits = load_habits(db_path)
-        habit_to_delete = None
-        for habit in habits:
-            if habit.name.lower() == name.lower():
-                habit_to_delete = habit
-                break
-        if habit_to_delete:
-            try:
-                with get_connection(db_path) as conn:
-                    c = conn.cursor()
-                    c.execute('DELETE FROM habits WHERE name = ?', (name,))
-                    conn.commit()
-                print(f"Habit '{name}' successfully deleted from {db_path}.")
-            except sqlite3.Error as e:
-                print(f"An error occurred in {db_path}: {e}")
+    def delete_habit(name: str, db_path: str = DEFAULT_DATABASE) -> bool:
+        """
+        Deletes a habit by its name for good. If the name matches several habits case-insensitively,
+        only the one with the exact spelling is deleted. Returns True if a habit was deleted.
+        """
+        try:
+            with get_connection(db_path) as conn:
+                c = conn.cursor()
+                c.execute(queries.BEGIN_IMMEDIATE)
+                c.execute(queries.SELECT_HABIT_ROWID_BY_NAME, (name, name))
+                row = c.fetchone()
+                deleted = row is not None
+                if deleted:
+                    c.execute(queries.DELETE_HABIT, (row[0],))
+                conn.commit()
+        except sqlite3.Error as e:
+            logs.event(logger, logging.ERROR, "db_error",
+                       "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+            return False
+        if deleted:
+            logs.event(logger, logging.INFO, "habit_deleted",
+                       "Habit '{habit}' successfully deleted from {db_path}.", habit=name, db_path=db_path)
+        else:
+            logs.event(logger, logging.WARNING, "habit_not_found",
+                       "Habit '{habit}' not found in {db_path}.", habit=name, db_path=db_path)
+        return deleted
+
+    def archive_habit(name: str, db_path: str = DEFAULT_DATABASE) -> bool:
+        """
+        Moves a habit to the archive, keeping its history. Like delete_habit, only one habit is archived
+        if the name matches several case-insensitively. Returns True if a habit was archived.
+        """
+        compact_events(db_path)
+        try:
+            with get_connection(db_path) as conn:
+                c = conn.cursor()
+                c.execute(queries.BEGIN_IMMEDIATE)
+                c.execute(queries.SELECT_HABIT_ROWID_BY_NAME, (name, name))
+                row = c.fetchone()
+                archived = row is not None
+                if archived:
+                    c.execute(queries.ARCHIVE_HABIT, (str(date.today()), row[0]))
+                    c.execute(queries.DELETE_HABIT, (row[0],))
+                conn.commit()
+        except sqlite3.Error as e:
+            logs.event(logger, logging.ERROR, "db_error",
+                       "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+            return False
+        if archived:
+            logs.event(logger, logging.INFO, "habit_archived",
+                       "Habit '{habit}' successfully archived in {db_path}.", habit=name, db_path=db_path)
+        else:
+            logs.event(logger, logging.WARNING, "habit_not_found",
+                       "Habit '{habit}' not found in {db_path}.", habit=name, db_path=db_path)
+        return archived
+
+    def restore_habit(name: str, db_path: str = DEFAULT_DATABASE) -> bool:
+        """
+        Moves the most recently archived habit with this name back to the active habits.
+        Returns True if a habit was restored.
+        """
+        try:
+            with get_connection(db_path) as conn:
+                c = conn.cursor()
+                c.execute(queries.BEGIN_IMMEDIATE)
+                c.execute(queries.SELECT_LATEST_ARCHIVED_ROWID, (name, name))
+                row = c.fetchone()
+                if row:
+                    c.execute(queries.SELECT_NEXT_POSITION)
+                    c.execute(queries.RESTORE_HABIT, (c.fetchone()[0], row[0]))
+                    c.execute(queries.DELETE_ARCHIVED_HABIT, (row[0],))
+                conn.commit()
+        except sqlite3.IntegrityError:
+            logs.event(logger, logging.WARNING, "habit_exists",
+                       "Habit with name '{habit}' already exists in {db_path}.", habit=name, db_path=db_path)
+            return False
+        except sqlite3.Error as e:
+            logs.event(logger, logging.ERROR, "db_error",
+                       "An error occurred in {db_path}: {error}", db_path=db_path, error=e)
+            return False
+        if row:
+            logs.event(logger, logging.INFO, "habit_restored",
+                       "Habit '{habit}' successfully restored in {db_path}.", habit=row[1], db_path=db_path)
         else:
-            print(f"Habit '{name}' not found in {db_path}.")
+            logs.event(logger, logging.WARNING, "habit_not_found",
+                       "Archived habit '{habit}' not found in {db_path}.", habit=name, db_path=db_path)
+        return bool(row)
 
 
     def get_all_habits(db_path: str = DEFAULT_DATABASE) -> List[Habit]:
@@ -165,23 +299,103 @@ class HabitManager:
         return load_habits(db_path)
 
 
+    def replay_habit(name: str, db_path: str = DEFAULT_DATABASE) -> Optional[Habit]:
+        """
+        Returns a habit with its not yet compacted completion events applied, including the longest streak.
+        Nothing is written to the database.
+        """
+        habit = load_habit(name, db_path)
+        if habit:
+            habit.apply_events(load_pending_events(habit.name, db_path))
+        return habit
+
+
+    def get_archived_habits(db_path: str = DEFAULT_DATABASE) -> List[Habit]:
+        """Returns a list of all archived habits."""
+        return load_archived_habits(db_path)
+
+
     def get_habits_by_periodicity(periodicity: str, db_path: str = DEFAULT_DATABASE) -> List[Habit]:
         """Returns a list of habits with a specific periodicity."""
-        all_habits = load_habits(db_path)
-        filtered_habits = [habit for habit in all_habits if habit.periodicity.lower() == periodicity.lower()]
-        return filtered_habits
-
-
-    def mark_habit_completed(habit_name: str, completion_date: str = None, db_path: str = DEFAULT_DATABASE):
-        """Marks a habit as completed by adding a completion date."""
-        habits = load_habits(db_path)
-        for habit in habits:
-            if habit.name.lower() == habit_name.lower():
-                habit.complete_task(completion_date)
-                save_habit(habit, db_path)
-                print(f"Habit '{habit_name}' marked as completed on {completion_date if completion_date else date.today()} in {db_path}.")
+        return load_habits_by_periodicity(periodicity, db_path)
+
+
+    def get_habits_by_status(status: int, db_path: str = DEFAULT_DATABASE) -> List[Habit]:
+        """Returns a list of habits with a specific status."""
+        return load_habits_by_status(status, db_path)
+
+
+    def search_habit_names(query: str, limit: int = 10, db_path: str = DEFAULT_DATABASE) -> List[str]:
+        """
+        Returns up to `limit` habit names matching `query` (case-insensitive) for autocompletion:
+        names starting with the query first, then names containing it (for queries shorter than 3 characters:
+        names with a word starting with it) and, if nothing matched, similar names.
+        """
+        names = search_habit_names_by_prefix(query, limit, db_path)
+        if query and len(names) < limit:
+            if len(query) >= 3:
+                matches = search_habit_names_by_substring(query, limit + len(names), db_path)
+            else:
+                matches = search_habit_names_by_word_prefix(query, limit + len(names), db_path)
+            found = set(names)
+            names += sorted((name for name in matches if name not in found), key=str.casefold)[:limit - len(names)]
+        if query and not names:
+            candidates = search_similar_habit_names(query, FUZZY_CANDIDATES, db_path)
+            names_by_key = {name.casefold(): name for name in candidates}
+            close_matches = difflib.get_close_matches(query.casefold(), list(names_by_key), n=limit)
+            names = [names_by_key[key] for key in close_matches]
+        return names
+
+
+    def mark_habit_completed(habit_name: str, completion_date: str = None, db_path: str = DEFAULT_DATABASE,
+                             compact: bool = True):
+        """
+        Marks a habit as completed by appending a completion event to the event log.
+        With compact=True the event is folded into the habit right away. Processes writing many completions
+        concurrently can pass compact=False and leave the folding to compact_events (e.g. a Compactor).
+        """
+        habit = load_habit(habit_name, db_path)
+        if habit:
+            completion_date = completion_date if completion_date else str(date.today())
+            if habit.was_completed_on(completion_date, load_pending_events(habit.name, db_path)):
+                logs.event(logger, logging.INFO, "task_already_completed",
+                           "Task on {date} has already been completed.", habit=habit.name, date=completion_date)
+                return
+            if not append_completion_event(habit.name, completion_date, COMPLETE_EVENT, db_path):
                 return
-        print(f"Habit '{habit_name}' not found in {db_path}.")
+            if compact:
+                compact_events(db_path)
+            logs.event(logger, logging.INFO, "habit_completed",
+                       "Habit '{habit}' marked as completed on {date} in {db_path}.",
+                       habit=habit_name, date=completion_date if completion_date else date.today(), db_path=db_path)
+            return
+        logs.event(logger, logging.WARNING, "habit_not_found",
+                   "Habit '{habit}' not found in {db_path}.", habit=habit_name, db_path=db_path)
+
+
+    def uncomplete_habit(habit_name: str, completion_date: str, db_path: str = DEFAULT_DATABASE,
+                         compact: bool = True) -> bool:
+        """
+        Removes a completion date from a habit by appending an undo event to the event log.
+        Returns True if the date was completed. See mark_habit_completed for `compact`.
+        """
+        habit = load_habit(habit_name, db_path)
+        if not habit:
+            logs.event(logger, logging.WARNING, "habit_not_found",
+                       "Habit '{habit}' not found in {db_path}.", habit=habit_name, db_path=db_path)
+            return False
+        if not habit.was_completed_on(completion_date, load_pending_events(habit.name, db_path)):
+            logs.event(logger, logging.WARNING, "task_not_completed",
+                       "Habit '{habit}' was not completed on {date}.", habit=habit.name, date=completion_date)
+            return False
+        if not append_completion_event(habit.name, completion_date, UNDO_EVENT, db_path):
+            return False
+        if compact:
+            compact_events(db_path)
+        logs.event(logger, logging.INFO, "habit_uncompleted",
+                   "Completion of habit '{habit}' on {date} removed in {db_path}.",
+                   habit=habit.name, date=completion_date, db_path=db_path)
+        return True
 
 
     def get_status_text(status: int) -> str:
@@ -0,0 +1,237 @@
+# profiling.py
+
+import cProfile
+import pstats
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional
+
+# Upper bounds (in milliseconds) of the latency histogram buckets.
+# Everything above the last bound ends up in the overflow bucket.
+BUCKET_BOUNDS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000]
+
+_enabled = False
+_operations: Dict[str, "OperationStats"] = {}
+_rows = {"read": 0, "written": 0}
+_profiler: Optional[cProfile.Profile] = None
+
+
+class OperationStats:
+    """
+    Aggregated timings of a single operation including:
+    1. record -> Adds one measured call.
+    2. as_dict -> Returns the aggregated values as a dictionary.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def record(self, elapsed: float):
+        """Adds one call that took `elapsed` seconds."""
+        self.calls += 1
+        self.total += elapsed
+        self.min = elapsed if self.min is None else min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        elapsed_ms = elapsed * 1000
+        for i, bound in enumerate(BUCKET_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def as_dict(self) -> dict:
+        """Returns the aggregated values (times in milliseconds) as a dictionary."""
+        labels = [f"<={bound}ms" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "total_ms": self.total * 1000,
+            "mean_ms": (self.total / self.calls) * 1000 if self.calls else 0.0,
+            "min_ms": (self.min or 0.0) * 1000,
+            "max_ms": self.max * 1000,
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+def enable():
+    """Turns the instrumentation on. Nothing is recorded until this is called."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Turns the instrumentation off. Already collected stats are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Returns True if the instrumentation is turned on."""
+    return _enabled
+
+
+def reset():
+    """Removes all collected timings and row counters."""
+    _operations.clear()
+    _rows["read"] = 0
+    _rows["written"] = 0
+
+
+def record(name: str, elapsed: float):
+    """Records a call of the operation `name` that took `elapsed` seconds."""
+    stats = _operations.get(name)
+    if stats is None:
+        stats = _operations[name] = OperationStats(name)
+    stats.record(elapsed)
+
+
+def count_rows_read(count: int):
+    """Adds `count` to the number of rows read from the database."""
+    if _enabled and count > 0:
+        _rows["read"] += count
+
+
+def count_rows_written(count: int):
+    """Adds `count` to the number of rows written to the database."""
+    if _enabled and count > 0:
+        _rows["written"] += count
+
+
+@contextmanager
+def timed(name: str):
+    """Context manager that records the runtime of its block under `name`."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def instrumented(name: str):
+    """Decorator that records the runtime of every call under `name`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def instrument_class(cls):
+    """Class decorator that times every public method as '<Class>.<method>'."""
+    for attr_name, attr in list(vars(cls).items()):
+        if callable(attr) and not attr_name.startswith("_"):
+            setattr(cls, attr_name, instrumented(f"{cls.__name__}.{attr_name}")(attr))
+    return cls
+
+
+def get_stats() -> dict:
+    """
+    Returns the aggregated stats as a dictionary with the keys
+    'operations' (name -> timings and histogram), 'rows_read' and 'rows_written'.
+    """
+    return {
+        "operations": {name: stats.as_dict() for name, stats in sorted(_operations.items())},
+        "rows_read": _rows["read"],
+        "rows_written": _rows["written"],
+    }
+
+
+def start_profile():
+    """Starts a cProfile capture for the current session."""
+    global _profiler
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+
+def stop_profile(output_path: str = None) -> Optional[pstats.Stats]:
+    """
+    Stops the running cProfile capture and returns its stats.
+    If `output_path` is given the raw profile is dumped there (readable with pstats/snakeviz).
+    """
+    global _profiler
+    if _profiler is None:
+        return None
+    _profiler.disable()
+    if output_path:
+        _profiler.dump_stats(output_path)
+    stats = pstats.Stats(_profiler)
+    _profiler = None
+    return stats
+
+
+##############################################################################
+# sqlite3 integration
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times queries and counts rows read and written."""
+
+    def execute(self, sql, parameters=()):
+        with timed("db.query"):
+            super().execute(sql, parameters)
+        count_rows_written(self.rowcount)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        with timed("db.query"):
+            super().executemany(sql, seq_of_parameters)
+        count_rows_written(self.rowcount)
+        return self
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            count_rows_read(1)
+        return row
+
+    def fetchmany(self, size: int = None):
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        count_rows_read(len(rows))
+        return rows
+
+    def fetchall(self) -> List[tuple]:
+        rows = super().fetchall()
+        count_rows_read(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        count_rows_read(1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection that hands out InstrumentedCursors and times commits."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        with timed("db.commit"):
+            super().commit()
+
+
+def connection_factory():
+    """Returns the connection class to pass to sqlite3.connect."""
+    return InstrumentedConnection if _enabled else sqlite3.Connection
@@ -0,0 +1,326 @@
+# queries.py
+
+import sqlite3
+from typing import Dict, List
+
+# All SQL statements of the app are defined once in this module.
+# sqlite3 caches prepared statements per connection keyed by the SQL text and database.get_connection
+# reuses its connections, so every statement is only compiled once per thread.
+
+HABIT_COLUMNS = ("name, periodicity, creation_date, completed_dates, goal_streak, "
+                 "status, position, longest_streak, target_per_week")
+
+# `id` makes the rowid explicit, so it is stable: VACUUM may renumber implicit rowids,
+# which would break the search indexes that refer to habits by rowid.
+CREATE_HABITS_TABLE = """CREATE TABLE IF NOT EXISTS habits(
+                  id INTEGER PRIMARY KEY,
+                  name TEXT UNIQUE,
+                  periodicity TEXT,
+                  creation_date TEXT,
+                  completed_dates TEXT,
+                  goal_streak INTEGER,
+                  status INTEGER,
+                  position INTEGER,
+                  longest_streak INTEGER,
+                  target_per_week INTEGER
+                  )"""
+
+# Archived habits live in their own table, so queries on active habits
+# (listing, status overview, longest streak) never touch archived rows.
+CREATE_ARCHIVED_HABITS_TABLE = """CREATE TABLE IF NOT EXISTS archived_habits(
+                  name TEXT,
+                  periodicity TEXT,
+                  creation_date TEXT,
+                  completed_dates TEXT,
+                  goal_streak INTEGER,
+                  status INTEGER,
+                  position INTEGER,
+                  longest_streak INTEGER,
+                  target_per_week INTEGER,
+                  archived_date TEXT
+                  )"""
+
+# Append-only log of completion events ('complete' or 'undo'). Writers only insert here;
+# compaction folds the events into the habits table. Folded events are kept, so incremental exports
+# can use the event id as watermark, until they are pruned.
+CREATE_COMPLETION_EVENTS_TABLE = """CREATE TABLE IF NOT EXISTS completion_events(
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  name TEXT,
+                  completion_date TEXT,
+                  action TEXT,
+                  recorded_at TEXT
+                  )"""
+
+# Streak runs of the habits, see streaks.py. Days are stored as day numbers (date.toordinal()).
+CREATE_STREAK_RUNS_TABLE = """CREATE TABLE IF NOT EXISTS streak_runs(
+                  name TEXT,
+                  start_day INTEGER,
+                  end_day INTEGER,
+                  length INTEGER,
+                  PRIMARY KEY (name, start_day)
+                  ) WITHOUT ROWID"""
+
+# Deleted (and archived) habits take their runs with them.
+CREATE_STREAK_RUNS_TRIGGER = """CREATE TRIGGER IF NOT EXISTS habits_streak_runs_delete AFTER DELETE ON habits BEGIN
+           DELETE FROM streak_runs WHERE name = old.name;
+       END"""
+
+# Single row with the id of the last compacted event and the id up to which events were pruned.
+CREATE_EVENT_LOG_STATE_TABLE = """CREATE TABLE IF NOT EXISTS event_log_state(
+                  id INTEGER PRIMARY KEY CHECK (id = 1),
+                  compacted_id INTEGER NOT NULL,
+                  pruned_id INTEGER NOT NULL
+                  )"""
+
+# Logs of earlier versions only held pending events, so nothing is compacted yet.
+INIT_EVENT_LOG_STATE = "INSERT OR IGNORE INTO event_log_state (id, compacted_id, pruned_id) VALUES (1, 0, 0)"
+
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_habits_name_nocase ON habits(name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_habits_periodicity ON habits(periodicity COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_habits_status ON habits(status)",
+    "CREATE INDEX IF NOT EXISTS idx_habits_position ON habits(position)",
+    "CREATE INDEX IF NOT EXISTS idx_habits_longest_streak ON habits(longest_streak DESC, position)",
+    "CREATE INDEX IF NOT EXISTS idx_archived_habits_name_nocase ON archived_habits(name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_completion_events_name ON completion_events(name, id)",
+    "CREATE INDEX IF NOT EXISTS idx_streak_runs_length ON streak_runs(name, length)",
+]
+
+# Habits tables of earlier versions have no `id` column. They are copied to a new table keeping their rowids as ids.
+HABITS_TABLE_HAS_ID = "SELECT COUNT(*) FROM pragma_table_info('habits') WHERE name = 'id'"
+
+MIGRATE_HABITS_TABLE = [
+    "ALTER TABLE habits RENAME TO habits_without_id",
+    CREATE_HABITS_TABLE,
+    f"INSERT INTO habits (id, {HABIT_COLUMNS}) SELECT rowid, {HABIT_COLUMNS} FROM habits_without_id",
+    "DROP TABLE habits_without_id",
+    "DROP TABLE IF EXISTS habit_name_trigrams",
+    "DROP TABLE IF EXISTS habit_name_words",
+]
+
+# Full text indexes on the habit names for search. Both read the names from the habits table (external content)
+# and fold case for all of Unicode, unlike NOCASE and lower() which only fold ASCII letters.
+# The trigram index finds any substring of 3 or more characters, the word index finds names by word prefixes.
+CREATE_SEARCH_TABLES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS habit_name_trigrams USING fts5("
+    "name, content='habits', content_rowid='id', tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS habit_name_words USING fts5("
+    "name, content='habits', content_rowid='id', tokenize='unicode61')",
+]
+
+# Keep the search indexes in sync with the habits table.
+CREATE_SEARCH_INSERT_TRIGGER = """CREATE TRIGGER IF NOT EXISTS habits_search_insert AFTER INSERT ON habits BEGIN
+           INSERT INTO habit_name_trigrams(rowid, name) VALUES (new.rowid, new.name);
+           INSERT INTO habit_name_words(rowid, name) VALUES (new.rowid, new.name);
+       END"""
+
+CREATE_SEARCH_TRIGGERS = [
+    CREATE_SEARCH_INSERT_TRIGGER,
+    """CREATE TRIGGER IF NOT EXISTS habits_search_delete AFTER DELETE ON habits BEGIN
+           INSERT INTO habit_name_trigrams(habit_name_trigrams, rowid, name) VALUES ('delete', old.rowid, old.name);
+           INSERT INTO habit_name_words(habit_name_words, rowid, name) VALUES ('delete', old.rowid, old.name);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS habits_search_update AFTER UPDATE OF name ON habits BEGIN
+           INSERT INTO habit_name_trigrams(habit_name_trigrams, rowid, name) VALUES ('delete', old.rowid, old.name);
+           INSERT INTO habit_name_words(habit_name_words, rowid, name) VALUES ('delete', old.rowid, old.name);
+           INSERT INTO habit_name_trigrams(rowid, name) VALUES (new.rowid, new.name);
+           INSERT INTO habit_name_words(rowid, name) VALUES (new.rowid, new.name);
+       END""",
+]
+
+# Bulk loads index the new names in one statement per index instead of through the insert trigger,
+# which updates the indexes row by row and makes bulk inserts several times slower.
+SELECT_MAX_HABIT_ROWID = "SELECT COALESCE(MAX(rowid), 0) FROM habits"
+
+DROP_SEARCH_INSERT_TRIGGER = "DROP TRIGGER IF EXISTS habits_search_insert"
+
+INDEX_NEW_HABIT_NAMES = [
+    "INSERT INTO habit_name_trigrams(rowid, name) SELECT rowid, name FROM habits WHERE rowid > ?",
+    "INSERT INTO habit_name_words(rowid, name) SELECT rowid, name FROM habits WHERE rowid > ?",
+]
+
+COUNT_SEARCH_TABLES = ("SELECT COUNT(*) FROM sqlite_master "
+                       "WHERE type = 'table' AND name IN ('habit_name_trigrams', 'habit_name_words')")
+
+# Rebuilds the search indexes from the habits table, for databases created before the indexes existed.
+REBUILD_SEARCH_INDEXES = [
+    "INSERT INTO habit_name_trigrams(habit_name_trigrams) VALUES ('rebuild')",
+    "INSERT INTO habit_name_words(habit_name_words) VALUES ('rebuild')",
+]
+
+# Indexes of earlier versions that are no longer used
+DROP_OBSOLETE_INDEXES = [
+    "DROP INDEX IF EXISTS idx_completion_events_name_nocase",
+]
+
+SELECT_NEXT_POSITION = "SELECT COALESCE(MAX(position) + 1, 0) FROM habits"
+
+INSERT_HABIT = f"INSERT INTO habits ({HABIT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+UPDATE_HABIT = """UPDATE habits SET periodicity = ?, creation_date = ?, completed_dates = ?, goal_streak = ?,
+                  status = ?, position = ?, longest_streak = ?, target_per_week = ?
+                  WHERE name = ?"""
+
+SELECT_ALL_HABITS = f"SELECT {HABIT_COLUMNS} FROM habits"
+
+SELECT_COMPLETED_DATES = "SELECT name, completed_dates FROM habits"
+
+# Names are only unique case-sensitively, so "Read" and "read" can both exist. Lookups by name are
+# case-insensitive but prefer the exact spelling: the name is passed twice, the second time for ORDER BY.
+SELECT_HABIT_BY_NAME = (f"SELECT {HABIT_COLUMNS} FROM habits WHERE name = ? COLLATE NOCASE "
+                        "ORDER BY name = ? DESC LIMIT 1")
+
+SELECT_HABIT_ROWID_BY_NAME = ("SELECT rowid, name FROM habits WHERE name = ? COLLATE NOCASE "
+                              "ORDER BY name = ? DESC LIMIT 1")
+
+SELECT_HABIT_BY_ROWID = f"SELECT {HABIT_COLUMNS} FROM habits WHERE rowid = ?"
+
+# Habit names in the range [lower, upper) in case-insensitive order, used for prefix search.
+SEARCH_HABIT_NAMES_BY_RANGE = ("SELECT name FROM habits WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE "
+                               "ORDER BY name COLLATE NOCASE LIMIT ?")
+
+# Names matching an FTS5 query. Without ORDER BY the matches come in rowid order and the search stops at the limit.
+SEARCH_HABIT_NAMES_BY_TRIGRAMS = "SELECT name FROM habit_name_trigrams WHERE habit_name_trigrams MATCH ? LIMIT ?"
+
+SEARCH_HABIT_NAMES_BY_WORDS = "SELECT name FROM habit_name_words WHERE habit_name_words MATCH ? LIMIT ?"
+
+# Names sharing the most (and rarest) trigrams with the search term first, used to find names despite typos.
+SEARCH_SIMILAR_HABIT_NAMES = ("SELECT name FROM habit_name_trigrams WHERE habit_name_trigrams MATCH ? "
+                              "ORDER BY rank LIMIT ?")
+
+SELECT_HABITS_BY_PERIODICITY = f"SELECT {HABIT_COLUMNS} FROM habits WHERE periodicity = ? COLLATE NOCASE"
+
+SELECT_HABITS_BY_STATUS = f"SELECT {HABIT_COLUMNS} FROM habits WHERE status = ?"
+
+SELECT_HABIT_WITH_LONGEST_STREAK = (f"SELECT {HABIT_COLUMNS} FROM habits "
+                                    "ORDER BY longest_streak DESC, position LIMIT 1")
+
+SELECT_LONGEST_STREAK_BY_NAME = ("SELECT longest_streak FROM habits WHERE name = ? COLLATE NOCASE "
+                                 "ORDER BY name = ? DESC LIMIT 1")
+
+# Delete and archive work on a single row resolved with SELECT_HABIT_ROWID_BY_NAME.
+DELETE_HABIT = "DELETE FROM habits WHERE rowid = ?"
+
+ARCHIVE_HABIT = (f"INSERT INTO archived_habits ({HABIT_COLUMNS}, archived_date) "
+                 f"SELECT {HABIT_COLUMNS}, ? FROM habits WHERE rowid = ?")
+
+SELECT_ARCHIVED_HABITS = f"SELECT {HABIT_COLUMNS} FROM archived_habits ORDER BY archived_date, rowid"
+
+# The most recently archived habit with this name, in case a name was archived more than once.
+# Like SELECT_HABIT_ROWID_BY_NAME the exact spelling is preferred, so the name is passed twice.
+SELECT_LATEST_ARCHIVED_ROWID = ("SELECT rowid, name FROM archived_habits WHERE name = ? COLLATE NOCASE "
+                                "ORDER BY name = ? DESC, archived_date DESC, rowid DESC LIMIT 1")
+
+# A restored habit is put at the end of the list (position from SELECT_NEXT_POSITION), because its old position
+# may have been given to a habit created in the meantime.
+RESTORE_HABIT = (f"INSERT INTO habits ({HABIT_COLUMNS}) "
+                 "SELECT name, periodicity, creation_date, completed_dates, goal_streak, "
+                 "status, ?, longest_streak, target_per_week FROM archived_habits WHERE rowid = ?")
+
+DELETE_ARCHIVED_HABIT = "DELETE FROM archived_habits WHERE rowid = ?"
+
+# Takes the write lock up front, so the events read during compaction cannot change before they are folded.
+BEGIN_IMMEDIATE = "BEGIN IMMEDIATE"
+
+# Read transaction, so several queries see the same state of the database.
+BEGIN_READ = "BEGIN DEFERRED"
+
+INSERT_COMPLETION_EVENT = ("INSERT INTO completion_events (name, completion_date, action, recorded_at) "
+                           "VALUES (?, ?, ?, ?)")
+
+SELECT_EVENT_LOG_STATE = "SELECT compacted_id, pruned_id FROM event_log_state WHERE id = 1"
+
+UPDATE_COMPACTED_ID = "UPDATE event_log_state SET compacted_id = ? WHERE id = 1"
+
+UPDATE_PRUNED_ID = "UPDATE event_log_state SET pruned_id = ? WHERE id = 1"
+
+SELECT_PENDING_EVENTS = ("SELECT id, name, completion_date, action FROM completion_events "
+                         "WHERE id > ? ORDER BY id LIMIT ?")
+
+SELECT_PENDING_EVENTS_FOR_HABIT = ("SELECT completion_date, action FROM completion_events "
+                                   "WHERE name = ? AND id > (SELECT compacted_id FROM event_log_state WHERE id = 1) "
+                                   "ORDER BY id")
+
+# All events after a watermark, compacted or not, for incremental exports.
+SELECT_EVENTS_AFTER = ("SELECT id, name, completion_date, action FROM completion_events "
+                       "WHERE id > ? ORDER BY id")
+
+DELETE_EVENTS_UP_TO = "DELETE FROM completion_events WHERE id <= ?"
+
+SELECT_STREAK_RUN_AT = ("SELECT start_day, end_day FROM streak_runs WHERE name = ? AND start_day <= ? "
+                        "ORDER BY start_day DESC LIMIT 1")
+
+SELECT_STREAK_RUN_AFTER = ("SELECT start_day, end_day FROM streak_runs WHERE name = ? AND start_day > ? "
+                           "ORDER BY start_day LIMIT 1")
+
+SELECT_HAS_STREAK_RUNS = "SELECT 1 FROM streak_runs WHERE name = ? LIMIT 1"
+
+SELECT_LONGEST_STREAK_RUN = "SELECT length FROM streak_runs WHERE name = ? ORDER BY length DESC LIMIT 1"
+
+INSERT_STREAK_RUN = "INSERT INTO streak_runs (name, start_day, end_day, length) VALUES (?, ?, ?, ?)"
+
+DELETE_STREAK_RUN = "DELETE FROM streak_runs WHERE name = ? AND start_day = ?"
+
+DELETE_STREAK_RUNS = "DELETE FROM streak_runs WHERE name = ?"
+
+# Trade durability for speed while generating large test databases.
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -200000",
+]
+
+BULK_LOAD_RESET_PRAGMAS = [
+    "PRAGMA synchronous = FULL",
+    "PRAGMA cache_size = -2000",
+]
+
+# Queries that run on every user action and must never fall back to a full table scan,
+# together with sample parameters for EXPLAIN QUERY PLAN.
+HOT_QUERIES = {
+    "next_position": (SELECT_NEXT_POSITION, ()),
+    "update_habit": (UPDATE_HABIT, ("daily", "2024-01-01", "", 0, 1, 0, 0, 0, "habit 1")),
+    "habit_by_name": (SELECT_HABIT_BY_NAME, ("habit 1", "habit 1")),
+    "habit_rowid_by_name": (SELECT_HABIT_ROWID_BY_NAME, ("habit 1", "habit 1")),
+    "habit_by_rowid": (SELECT_HABIT_BY_ROWID, (1,)),
+    "habit_names_by_range": (SEARCH_HABIT_NAMES_BY_RANGE, ("hab", "hab\U0010ffff", 10)),
+    "habit_names_by_trigrams": (SEARCH_HABIT_NAMES_BY_TRIGRAMS, ('"bit 1"', 10)),
+    "habit_names_by_words": (SEARCH_HABIT_NAMES_BY_WORDS, ('"ha"*', 10)),
+    "similar_habit_names": (SEARCH_SIMILAR_HABIT_NAMES, ('"hab" OR "abi" OR "bti"', 100)),
+    "habits_by_periodicity": (SELECT_HABITS_BY_PERIODICITY, ("weekly",)),
+    "habits_by_status": (SELECT_HABITS_BY_STATUS, (3,)),
+    "habit_with_longest_streak": (SELECT_HABIT_WITH_LONGEST_STREAK, ()),
+    "longest_streak_by_name": (SELECT_LONGEST_STREAK_BY_NAME, ("habit 1", "habit 1")),
+    "delete_habit": (DELETE_HABIT, (1,)),
+    "archive_habit": (ARCHIVE_HABIT, ("2024-01-01", 1)),
+    "latest_archived_rowid": (SELECT_LATEST_ARCHIVED_ROWID, ("habit 1", "habit 1")),
+    "restore_habit": (RESTORE_HABIT, (0, 1)),
+    "delete_archived_habit": (DELETE_ARCHIVED_HABIT, (1,)),
+    "pending_events": (SELECT_PENDING_EVENTS, (0, 1000)),
+    "pending_events_for_habit": (SELECT_PENDING_EVENTS_FOR_HABIT, ("habit 1",)),
+    "events_after": (SELECT_EVENTS_AFTER, (1000,)),
+    "streak_run_at": (SELECT_STREAK_RUN_AT, ("habit 1", 738000)),
+    "streak_run_after": (SELECT_STREAK_RUN_AFTER, ("habit 1", 738000)),
+    "has_streak_runs": (SELECT_HAS_STREAK_RUNS, ("habit 1",)),
+    "longest_streak_run": (SELECT_LONGEST_STREAK_RUN, ("habit 1",)),
+    "delete_streak_run": (DELETE_STREAK_RUN, ("habit 1", 738000)),
+    "delete_streak_runs": (DELETE_STREAK_RUNS, ("habit 1",)),
+    "delete_events_up_to": (DELETE_EVENTS_UP_TO, (1000,)),
+}
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Returns the detail lines of EXPLAIN QUERY PLAN for a statement."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def find_full_table_scans(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    """
+    Runs EXPLAIN QUERY PLAN on every hot query and returns the ones that scan a whole table
+    (a 'SCAN' step without an index) as a dictionary of query name -> plan.
+    """
+    offenders = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = explain(conn, sql, params)
+        if any(step.startswith("SCAN") and "INDEX" not in step for step in plan):
+            offenders[name] = plan
+    return offenders
@@ -0,0 +1,144 @@
+# seed.py
+
+import argparse
+import logging
+import random
+from datetime import date, datetime, timedelta
+from typing import List
+from model import GREEN, YELLOW, RED
+from database import create_table, get_connection, insert_habits, DEFAULT_DATABASE
+import logs
+import queries
+
+logger = logs.get_logger("seed")
+
+ACTIVITIES = [
+    "Read", "Run", "Meditate", "Stretch", "Journal", "Practice guitar", "Learn Spanish", "Drink water",
+    "Walk the dog", "Cook dinner", "Call family", "Clean kitchen", "Water plants", "Do yoga", "Go swimming",
+    "Review budget", "Grocery shopping", "House cleaning", "Brush teeth", "Exercise",
+]
+
+DAILY_SHARE = 0.7      # Share of daily habits, the rest is weekly
+BACKFILL_RATE = 0.05   # Share of missed periods that are marked as completed later on
+DEFAULT_DAYS = 180
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def _simulate(rng: random.Random, first_period: int, periods: int, adherence: float) -> List[int]:
+    """
+    Simulates the completions of one habit as period indices in the order they were recorded.
+    After a completed period the habit is kept up with probability `adherence`,
+    after a missed one it is only resumed with half that probability, which produces streaks and gaps.
+    Some missed periods are backfilled and recorded at the end.
+    """
+    completed = []
+    missed = []
+    done = rng.random() < adherence
+    resume = adherence / 2
+    for period in range(first_period, periods):
+        done = rng.random() < (adherence if done else resume)
+        if done:
+            completed.append(period)
+        else:
+            missed.append(period)
+    backfills = [period for period in missed if rng.random() < BACKFILL_RATE]
+    return completed + backfills
+
+
+def _longest_streak(periods: List[int]) -> int:
+    """Returns the longest run of consecutive period indices."""
+    longest = current = 0
+    previous = None
+    for period in sorted(periods):
+        current = current + 1 if previous is not None and period == previous + 1 else 1
+        longest = max(longest, current)
+        previous = period
+    return longest
+
+
+def _status(periods: List[int], last_period: int) -> int:
+    """Derives the status from the number of missed periods at the end."""
+    missed = last_period - max(periods) if periods else last_period + 1
+    if missed == 0:
+        return GREEN
+    elif missed <= 3:
+        return YELLOW
+    return RED
+
+
+def seed_database(count: int, db_path: str = DEFAULT_DATABASE, days: int = DEFAULT_DAYS, seed: int = None,
+                  end_date: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Adds `count` generated habits with `days` days of completion history ending at `end_date` (default today).
+    The same `seed` always produces the same habits. Habits are written in batches of `batch_size`,
+    one transaction per batch. Returns the number of completions written.
+    """
+    rng = random.Random(seed)
+    end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else date.today()
+    start = end - timedelta(days=days - 1)
+    day_strings = [str(start + timedelta(days=i)) for i in range(days)]
+    # Weekly habits are completed on Mondays, like Habit.get_streak expects
+    week_strings = day_strings[(7 - start.weekday()) % 7::7]
+
+    create_table(db_path)
+    total_completions = 0
+    # The connection is shared with the rest of the app, so the bulk load settings are reset afterwards.
+    try:
+        with get_connection(db_path) as conn:
+            c = conn.cursor()
+            for statement in queries.BULK_LOAD_PRAGMAS:
+                c.execute(statement)
+            c.execute(queries.SELECT_NEXT_POSITION)
+            first_position = c.fetchone()[0]
+
+            batch = []
+            for i in range(count):
+                position = first_position + i
+                if rng.random() < DAILY_SHARE:
+                    periodicity, dates = "daily", day_strings
+                    goal_streak, target_per_week = rng.choice([7, 14, 21, 30]), 0
+                else:
+                    periodicity, dates = "weekly", week_strings
+                    goal_streak, target_per_week = rng.choice([4, 8, 12]), rng.randint(1, 3)
+                periods = len(dates)
+                first_period = rng.randrange(periods // 4 + 1) if periods else 0
+                completions = _simulate(rng, first_period, periods, rng.uniform(0.3, 0.95))
+                total_completions += len(completions)
+
+                batch.append((
+                    f"{rng.choice(ACTIVITIES)} #{position}",
+                    periodicity,
+                    dates[first_period] if periods else str(start),
+                    ",".join([dates[period] for period in completions]),
+                    goal_streak,
+                    _status(completions, periods - 1),
+                    position,
+                    _longest_streak(completions),
+                    target_per_week,
+                ))
+                if len(batch) >= batch_size:
+                    insert_habits(conn, batch)
+                    batch = []
+                    logs.event(logger, logging.DEBUG, "seed_progress",
+                               "{done}/{count} habits written to {db_path}.", done=i + 1, count=count, db_path=db_path)
+            if batch:
+                insert_habits(conn, batch)
+    finally:
+        for statement in queries.BULK_LOAD_RESET_PRAGMAS:
+            get_connection(db_path).execute(statement)
+    logs.event(logger, logging.INFO, "database_seeded",
+               "{count} habits with {completions} completions added to {db_path}.",
+               count=count, completions=total_completions, db_path=db_path)
+    return total_completions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fills a database with generated habits for load testing.")
+    parser.add_argument("count", type=int, help="number of habits to generate")
+    parser.add_argument("--db", default=DEFAULT_DATABASE, help="database file (default: %(default)s)")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="days of history (default: %(default)s)")
+    parser.add_argument("--seed", type=int, help="seed of the random generator for reproducible data")
+    parser.add_argument("--end-date", help="last day of the history (YYYY-MM-DD), default today")
+    args = parser.parse_args()
+    logs.enable(logging.DEBUG)
+    seed_database(args.count, args.db, days=args.days, seed=args.seed, end_date=args.end_date)
@@ -0,0 +1,137 @@
+# streaks.py
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+import sqlite3
+import queries
+
+# The streak runs of every habit are stored in the 'streak_runs' table. A run is a sequence of completion dates
+# that follow each other at exactly one period (1 day or 7 days), the same definition Habit.update_longest_streak
+# uses. Adding or removing a date only touches the runs next to it, each found with one indexed lookup,
+# so compaction keeps the longest streak up to date without reading all dates of a habit.
+# All functions work on the cursor of the caller's transaction.
+
+# Days between two completions of a streak. Dates of other periodicities never form a streak.
+STEPS = {'daily': 1, 'weekly': 7}
+
+
+def step(periodicity: str) -> int:
+    """Returns the days between two completions of a streak, 0 if the periodicity has no streaks."""
+    return STEPS.get(periodicity.lower(), 0)
+
+
+def day(completion_date: str) -> int:
+    """
+    Returns the day number of a completion date. Only YYYY-MM-DD is accepted, like everywhere else in the model,
+    so a date in another form never makes it into completed_dates. Raises ValueError otherwise.
+    """
+    return datetime.strptime(completion_date, '%Y-%m-%d').toordinal()
+
+
+def _length(step: int, start: int, end: int) -> int:
+    return (end - start) // step + 1 if step else 1
+
+
+def _run_at(c: sqlite3.Cursor, name: str, day: int) -> Optional[Tuple[int, int]]:
+    """Returns (start, end) of the last run starting on or before `day`."""
+    c.execute(queries.SELECT_STREAK_RUN_AT, (name, day))
+    return c.fetchone()
+
+
+def _run_after(c: sqlite3.Cursor, name: str, day: int) -> Optional[Tuple[int, int]]:
+    """Returns (start, end) of the first run starting after `day`."""
+    c.execute(queries.SELECT_STREAK_RUN_AFTER, (name, day))
+    return c.fetchone()
+
+
+def _contains(run: Optional[Tuple[int, int]], step: int, day: int) -> bool:
+    return run is not None and run[0] <= day <= run[1] and \
+        (day == run[0] or (step and (day - run[0]) % step == 0))
+
+
+def _insert(c: sqlite3.Cursor, name: str, step: int, start: int, end: int):
+    c.execute(queries.INSERT_STREAK_RUN, (name, start, end, _length(step, start, end)))
+
+
+def _delete(c: sqlite3.Cursor, name: str, start: int):
+    c.execute(queries.DELETE_STREAK_RUN, (name, start))
+
+
+def build(c: sqlite3.Cursor, name: str, periodicity: str, completed_dates: List[str]):
+    """Replaces the stored runs of a habit with the runs of `completed_dates`."""
+    days = sorted({day(completion_date) for completion_date in completed_dates})
+    habit_step = step(periodicity)
+    runs = []
+    for d in days:
+        if runs and habit_step and d - runs[-1][1] == habit_step:
+            runs[-1][1] = d
+        else:
+            runs.append([d, d])
+    c.execute(queries.DELETE_STREAK_RUNS, (name,))
+    c.executemany(queries.INSERT_STREAK_RUN,
+                  [(name, start, end, _length(habit_step, start, end)) for start, end in runs])
+
+
+def ensure(c: sqlite3.Cursor, name: str, periodicity: str, completed_dates: List[str]):
+    """
+    Builds the runs of a habit that has completion dates but no stored runs yet,
+    e.g. habits written before runs were stored, by seed.py or whose runs were deleted.
+    """
+    if completed_dates:
+        c.execute(queries.SELECT_HAS_STREAK_RUNS, (name,))
+        if c.fetchone() is None:
+            build(c, name, periodicity, completed_dates)
+
+
+def add(c: sqlite3.Cursor, name: str, step: int, day: int) -> bool:
+    """Adds a day and merges or splits the affected runs. Returns False if the day was already part of a run."""
+    run = _run_at(c, name, day)
+    if _contains(run, step, day):
+        return False
+    if run is not None and day < run[1]:
+        # The day lies between two dates of a run (only possible for weekly habits) and splits it.
+        start, end = run
+        before = start + (day - start) // step * step
+        _delete(c, name, start)
+        _insert(c, name, step, start, before)
+        _insert(c, name, step, day, day)
+        _insert(c, name, step, before + step, end)
+        return True
+    following = _run_after(c, name, day)
+    joins_left = run is not None and step and day - run[1] == step
+    joins_right = following is not None and step and following[0] - day == step
+    if joins_left:
+        _delete(c, name, run[0])
+    if joins_right:
+        _delete(c, name, following[0])
+    _insert(c, name, step, run[0] if joins_left else day, following[1] if joins_right else day)
+    return True
+
+
+def remove(c: sqlite3.Cursor, name: str, step: int, day: int) -> bool:
+    """Removes a day and shrinks or splits the run containing it. Returns False if the day was not part of a run."""
+    run = _run_at(c, name, day)
+    if not _contains(run, step, day):
+        return False
+    start, end = run
+    _delete(c, name, start)
+    if start == end:
+        # The neighbouring runs might now follow each other at exactly one period.
+        previous, following = _run_at(c, name, day), _run_after(c, name, day)
+        if step and previous is not None and following is not None and following[0] - previous[1] == step:
+            _delete(c, name, previous[0])
+            _delete(c, name, following[0])
+            _insert(c, name, step, previous[0], following[1])
+        return True
+    if day > start:
+        _insert(c, name, step, start, day - step)
+    if day < end:
+        _insert(c, name, step, day + step, end)
+    return True
+
+
+def longest(c: sqlite3.Cursor, name: str) -> int:
+    """Returns the length of the longest stored run of a habit."""
+    c.execute(queries.SELECT_LONGEST_STREAK_RUN, (name,))
+    row = c.fetchone()
+    return row[0] if row else 0
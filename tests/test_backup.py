@@ -0,0 +1,102 @@
+# tests/test_backup.py
+
+import pytest
+from model import HabitManager
+from backup import backup_database, export_completions, apply_completions
+from database import create_table, add_predefined_habits, load_habits, load_habit, prune_events
+
+@pytest.fixture
+def test_db(tmp_path):
+    """
+    Fixture for setting up and tearing down a temporary test database.
+    """
+    db_path = tmp_path / 'test_backup.db'
+    db_path = str(db_path)
+
+    create_table(db_path)
+    add_predefined_habits(db_path)
+
+    yield db_path
+
+
+class TestBackup:
+    """
+    Tests all functions of backup.py
+    1. backup_database
+    2. export_completions
+    3. prune_events
+    4. incremental_backup
+    5. invalid_rows_skipped
+    """
+
+    def test_backup_database(self, test_db, tmp_path):
+        """Tests that the snapshot contains the same habits as the database."""
+        target = str(tmp_path / 'snapshot.db')
+        backup_database(target, db_path=test_db, pages=1, sleep=0)
+        original = {habit.name: habit.completed_dates for habit in load_habits(test_db)}
+        copied = {habit.name: habit.completed_dates for habit in load_habits(target)}
+        assert copied == original
+
+    def test_export_completions(self, test_db, tmp_path):
+        """Tests that only events after the watermark are exported, including backfilled completions and undos."""
+        output = str(tmp_path / 'completions.csv')
+        total = sum(len(habit.completed_dates) for habit in load_habits(test_db))
+        count, watermark = export_completions(output, db_path=test_db)
+        assert count == total
+
+        last_date = max(load_habit("Exercise", test_db).completed_dates)
+        HabitManager.mark_habit_completed("Exercise", "2099-01-01", db_path=test_db)
+        HabitManager.uncomplete_habit("Exercise", last_date, db_path=test_db)
+        HabitManager.mark_habit_completed("Read a book", "2000-01-01", db_path=test_db)
+        count, next_watermark = export_completions(output, since=watermark, db_path=test_db)
+        with open(output) as f:
+            rows = f.read().splitlines()
+        assert rows[1:] == ["Exercise,2099-01-01,complete", f"Exercise,{last_date},undo",
+                            "Read a book,2000-01-01,complete"]
+        assert count == 3
+        assert next_watermark == watermark + 3
+        assert export_completions(output, since=next_watermark, db_path=test_db) == (0, next_watermark)
+
+    def test_prune_events(self, test_db, tmp_path):
+        """Tests that pruned events are not exported silently."""
+        output = str(tmp_path / 'completions.csv')
+        _, watermark = export_completions(output, db_path=test_db)
+        HabitManager.mark_habit_completed("Exercise", "2099-01-01", db_path=test_db)
+        _, next_watermark = export_completions(output, since=watermark, db_path=test_db)
+        assert prune_events(next_watermark, db_path=test_db) == 1
+        with pytest.raises(ValueError):
+            export_completions(output, since=watermark, db_path=test_db)
+        assert export_completions(output, since=next_watermark, db_path=test_db) == (0, next_watermark)
+
+    def test_incremental_backup(self, test_db, tmp_path):
+        """Tests restoring a snapshot and applying an incremental export on top of it."""
+        snapshot = str(tmp_path / 'snapshot.db')
+        increment = str(tmp_path / 'increment.csv')
+        backup_database(snapshot, db_path=test_db)
+        _, watermark = export_completions(str(tmp_path / 'full.csv'), db_path=test_db)
+
+        first_date = min(load_habit("Read a book", test_db).completed_dates)
+        HabitManager.mark_habit_completed("Read a book", "2099-01-01", db_path=test_db)
+        HabitManager.mark_habit_completed("Read a book", "2099-01-02", db_path=test_db)
+        HabitManager.uncomplete_habit("Read a book", first_date, db_path=test_db)
+        export_completions(increment, since=watermark, db_path=test_db)
+
+        assert apply_completions(increment, db_path=snapshot) == 3
+        apply_completions(increment, db_path=snapshot)  # applying again changes nothing
+        restored = load_habit("Read a book", db_path=snapshot)
+        original = load_habit("Read a book", db_path=test_db)
+        assert sorted(restored.completed_dates) == sorted(original.completed_dates)
+        assert restored.longest_streak == original.longest_streak
+
+    def test_invalid_rows_skipped(self, test_db, tmp_path):
+        """Tests that rows with an invalid date or action are skipped and the valid rows are applied."""
+        increment = str(tmp_path / 'increment.csv')
+        with open(increment, "w", newline="") as f:
+            f.write("name,completion_date,action\r\n"
+                    "Exercise,2099-13-01,complete\r\n"
+                    "Exercise,2099-01-01,skip\r\n"
+                    "Exercise,2099-01-02,complete\r\n")
+        assert apply_completions(increment, db_path=test_db) == 1
+        habit = load_habit("Exercise", test_db)
+        assert habit.was_completed_on("2099-01-02")
+        assert not habit.was_completed_on("2099-01-01")
@@ -0,0 +1,155 @@
+# tests/test_events.py
+
+import os
+import subprocess
+import sys
+import threading
+from datetime import date, timedelta
+import pytest
+import compaction
+from model import HabitManager, COMPLETE_EVENT, UNDO_EVENT
+from compaction import Compactor
+from database import (create_table, add_predefined_habits, load_habit, load_pending_events, get_connection,
+                      append_completion_event, compact_events)
+import queries
+
+@pytest.fixture
+def test_db(tmp_path):
+    """
+    Fixture for setting up and tearing down a temporary test database.
+    """
+    db_path = tmp_path / 'test_events.db'
+    db_path = str(db_path)
+
+    create_table(db_path)
+    add_predefined_habits(db_path)
+
+    yield db_path
+
+
+class TestEvents:
+    """
+    Tests the completion event log and its compaction
+    1. events_pending_until_compacted
+    2. undo_event
+    3. undo_and_complete_pending
+    4. compaction_in_batches
+    5. unknown_habit_events_dropped
+    6. concurrent_writers
+    7. invalid_events_skipped
+    8. compactor_survives_errors
+    9. import_compaction_first
+    """
+
+    def test_events_pending_until_compacted(self, test_db):
+        """Tests that completions are only appended until compaction folds them into the habit."""
+        HabitManager.mark_habit_completed("Exercise", "2099-01-01", db_path=test_db, compact=False)
+        assert not load_habit("Exercise", test_db).was_completed_on("2099-01-01")
+        assert HabitManager.replay_habit("Exercise", db_path=test_db).was_completed_on("2099-01-01")
+
+        assert compact_events(test_db) == 1
+        assert load_habit("Exercise", test_db).was_completed_on("2099-01-01")
+        assert load_pending_events("Exercise", test_db) == []
+
+    def test_undo_event(self, test_db):
+        """Tests that an undo event removes the date and the longest streak is recalculated."""
+        habit = load_habit("Exercise", test_db)
+        last_date = max(habit.completed_dates)
+        append_completion_event("Exercise", last_date, UNDO_EVENT, test_db)
+        compact_events(test_db)
+        habit = load_habit("Exercise", test_db)
+        assert not habit.was_completed_on(last_date)
+        assert habit.longest_streak == 19
+
+    def test_undo_and_complete_pending(self, test_db):
+        """Tests that completing a date again after a pending undo is not taken for a duplicate."""
+        last_date = max(load_habit("Exercise", test_db).completed_dates)
+        assert HabitManager.uncomplete_habit("Exercise", last_date, db_path=test_db, compact=False)
+        assert not HabitManager.uncomplete_habit("Exercise", last_date, db_path=test_db, compact=False)
+        HabitManager.mark_habit_completed("Exercise", last_date, db_path=test_db, compact=False)
+        HabitManager.mark_habit_completed("Exercise", last_date, db_path=test_db, compact=False)
+        assert len(load_pending_events("Exercise", test_db)) == 2
+        compact_events(test_db)
+        habit = load_habit("Exercise", test_db)
+        assert habit.was_completed_on(last_date)
+        assert habit.longest_streak == 20
+
+    def test_compaction_in_batches(self, test_db):
+        """Tests that more events than one batch are all folded."""
+        start = date(2099, 1, 1)
+        for i in range(25):
+            append_completion_event("Read a book", str(start + timedelta(days=i)), COMPLETE_EVENT, test_db)
+        assert compact_events(test_db, batch_size=10) == 25
+        habit = load_habit("Read a book", test_db)
+        assert habit.was_completed_on("2099-01-25")
+        assert habit.longest_streak == 28
+
+    def test_unknown_habit_events_dropped(self, test_db):
+        """Tests that events of habits that no longer exist do not block the compaction."""
+        append_completion_event("Unknown habit", "2099-01-01", COMPLETE_EVENT, test_db)
+        assert compact_events(test_db) == 1
+        assert compact_events(test_db) == 0
+
+    def test_concurrent_writers(self, test_db):
+        """Tests that no completion is lost when several writers complete the same habit at once."""
+        compactor = Compactor(test_db, interval=0.01)
+        compactor.start()
+        start = date(2099, 1, 1)
+
+        def writer(offset: int):
+            for i in range(10):
+                completion_date = str(start + timedelta(days=offset * 10 + i))
+                HabitManager.mark_habit_completed("Brush teeth", completion_date, db_path=test_db, compact=False)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        compactor.stop()
+
+        habit = load_habit("Brush teeth", test_db)
+        assert all(habit.was_completed_on(str(start + timedelta(days=i))) for i in range(40))
+        assert habit.longest_streak == 40
+
+    def test_invalid_events_skipped(self, test_db):
+        """Tests that invalid events are not appended and logged ones do not block the compaction."""
+        assert not append_completion_event("Exercise", "2099-13-01", COMPLETE_EVENT, test_db)
+        assert not append_completion_event("Exercise", "2099-01-01", "skip", test_db)
+        HabitManager.mark_habit_completed("Exercise", "20990101", db_path=test_db)
+        assert load_pending_events("Exercise", test_db) == []
+
+        with get_connection(test_db) as conn:
+            conn.execute(queries.INSERT_COMPLETION_EVENT, ("Exercise", "2099-13-01", COMPLETE_EVENT, "2099-01-01"))
+        HabitManager.mark_habit_completed("Exercise", "2099-01-02", db_path=test_db)
+        habit = load_habit("Exercise", test_db)
+        assert habit.was_completed_on("2099-01-02")
+        assert "2099-13-01" not in habit.completed_dates
+        assert compact_events(test_db) == 0
+
+    def test_compactor_survives_errors(self, test_db, monkeypatch):
+        """Tests that a failing compaction is logged and the Compactor keeps running."""
+        calls = []
+
+        def flaky_compact(db_path, batch_size):
+            calls.append(db_path)
+            if len(calls) == 1:
+                raise ValueError("bad event")
+            return compact_events(db_path, batch_size)
+
+        monkeypatch.setattr(compaction, "compact_events", flaky_compact)
+        compactor = Compactor(test_db, interval=0.01)
+        compactor.start()
+        while len(calls) < 3:
+            assert compactor.is_alive()
+            threading.Event().wait(0.01)
+        HabitManager.mark_habit_completed("Exercise", "2099-01-01", db_path=test_db, compact=False)
+        compactor.stop()
+        assert not compactor.is_alive()
+        assert load_habit("Exercise", test_db).was_completed_on("2099-01-01")
+
+    def test_import_compaction_first(self):
+        """Tests that compaction can be imported before any other module of the app."""
+        result = subprocess.run([sys.executable, "-c", "import compaction"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert result.returncode == 0, result.stderr
@@ -0,0 +1,57 @@
+# tests/test_logs.py
+
+import logging
+import pytest
+import logs
+from model import Habit, HabitManager
+from database import create_table, add_predefined_habits
+
+@pytest.fixture
+def test_db(tmp_path):
+    """
+    Fixture for setting up and tearing down a temporary test database.
+    """
+    db_path = tmp_path / 'test_logs.db'
+    db_path = str(db_path)
+
+    create_table(db_path)
+    add_predefined_habits(db_path)
+
+    yield db_path
+
+
+class TestLogs:
+    """
+    Tests the structured logging of logs.py
+    1. silent_by_default
+    2. structured_events
+    3. level_filtering
+    """
+
+    def test_silent_by_default(self, test_db, capsys):
+        """Tests that the data layer writes nothing to stdout/stderr."""
+        HabitManager.create_habit("Meditate", "daily", 10, db_path=test_db)
+        HabitManager.delete_habit("Unknown habit", db_path=test_db)
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert captured.err == ""
+
+    def test_structured_events(self, test_db, caplog):
+        """Tests that events carry their name and fields."""
+        caplog.set_level(logging.INFO, logger=logs.LOGGER_NAME)
+        HabitManager.create_habit("Meditate", "daily", 10, db_path=test_db)
+        HabitManager.create_habit("Meditate", "daily", 10, db_path=test_db)
+        events = [record.event for record in caplog.records]
+        assert events == ["habit_saved", "habit_exists"]
+        assert caplog.records[0].fields["habit"] == "Meditate"
+        assert caplog.records[0].getMessage() == f"Habit 'Meditate' successfully saved to {test_db}."
+        assert caplog.records[1].levelno == logging.WARNING
+
+    def test_level_filtering(self, caplog):
+        """Tests that events below the configured level are dropped."""
+        caplog.set_level(logging.INFO, logger=logs.LOGGER_NAME)
+        habit = Habit(name="Read", periodicity="daily")
+        habit.complete_task("2024-10-11")
+        habit.complete_task("2024-10-11")
+        events = [record.event for record in caplog.records]
+        assert events == ["task_already_completed"]
@@ -2,7 +2,8 @@
 
 import pytest
 from model import Habit, HabitManager
-from database import create_table, add_predefined_habits, load_habits, save_habit
+from database import create_table, add_predefined_habits, load_habits, load_habit, save_habit, get_connection
+import queries
 import os
 import sqlite3
 
@@ -32,6 +33,16 @@ class TestModel:
     6. create_habit
     7. delete_habit
     8. get_status_text
+    9. archive_and_restore_habit
+    10. delete_missing_habit
+    11. case_variants
+    12. restore_case_variants
+    13. search_habit_names
+    14. search_index
+    15. search_index_after_vacuum
+    16. search_without_index
+    17. uncomplete_habit
+    18. uncomplete_task
 
     """
 
@@ -115,3 +126,123 @@ class TestModel:
         test_habit_status = test_habit.status
         status_text = HabitManager.get_status_text(test_habit_status)
         assert status_text == "Green (On Track)"
+
+    def test_archive_and_restore_habit(self, test_db):
+        """Tests archiving a habit and restoring it with its history"""
+        assert HabitManager.archive_habit("exercise", db_path=test_db)
+        habit_names = [habit.name for habit in load_habits(test_db)]
+        assert "Exercise" not in habit_names
+        archived = HabitManager.get_archived_habits(db_path=test_db)
+        assert [habit.name for habit in archived] == ["Exercise"]
+        assert archived[0].longest_streak == 20
+
+        assert HabitManager.restore_habit("Exercise", db_path=test_db)
+        habit = next((h for h in load_habits(test_db) if h.name == "Exercise"), None)
+        assert habit is not None
+        assert len(habit.completed_dates) == 20
+        assert HabitManager.get_archived_habits(db_path=test_db) == []
+
+    def test_delete_missing_habit(self, test_db):
+        """Tests that deleting, archiving or restoring an unknown habit changes nothing"""
+        assert not HabitManager.delete_habit("Unknown habit", db_path=test_db)
+        assert not HabitManager.archive_habit("Unknown habit", db_path=test_db)
+        assert not HabitManager.restore_habit("Unknown habit", db_path=test_db)
+        assert len(load_habits(test_db)) == 5
+
+    def test_case_variants(self, test_db):
+        """Tests that habits whose names only differ in case are completed and deleted separately"""
+        HabitManager.create_habit("read", "daily", 10, db_path=test_db)
+        HabitManager.create_habit("Read", "daily", 10, db_path=test_db)
+        HabitManager.mark_habit_completed("read", "2024-10-11", db_path=test_db)
+        assert load_habit("Read", test_db).completed_dates == []
+        assert load_habit("read", test_db).completed_dates == ["2024-10-11"]
+        assert HabitManager.delete_habit("Read", db_path=test_db)
+        assert [h.name for h in load_habits(test_db) if h.name.lower() == "read"] == ["read"]
+        assert HabitManager.archive_habit("READ", db_path=test_db)
+        assert [h.name for h in HabitManager.get_archived_habits(db_path=test_db)] == ["read"]
+        assert load_habit("read", test_db) is None
+
+    def test_restore_case_variants(self, test_db):
+        """Tests that restoring prefers the exact spelling and puts the habit at the end of the list"""
+        HabitManager.create_habit("Read", "daily", 10, db_path=test_db)
+        HabitManager.archive_habit("Read", db_path=test_db)
+        HabitManager.create_habit("read", "daily", 10, db_path=test_db)
+        HabitManager.archive_habit("read", db_path=test_db)
+        HabitManager.create_habit("Meditate", "daily", 10, db_path=test_db)
+        assert HabitManager.restore_habit("Read", db_path=test_db)
+        assert [h.name for h in HabitManager.get_archived_habits(db_path=test_db)] == ["read"]
+        positions = [h.position for h in load_habits(test_db)]
+        assert len(positions) == len(set(positions))
+        assert load_habit("Read", test_db).position == max(positions)
+
+    def test_search_habit_names(self, test_db):
+        """Tests prefix, substring and similar name search"""
+        assert HabitManager.search_habit_names("", db_path=test_db) == [
+            "Brush teeth", "Exercise", "Grocery shopping", "House cleaning", "Read a book"]
+        assert HabitManager.search_habit_names("ex", db_path=test_db) == ["Exercise"]
+        assert HabitManager.search_habit_names("h", db_path=test_db) == ["House cleaning"]
+        assert HabitManager.search_habit_names("sh", db_path=test_db) == ["Grocery shopping"]
+        assert HabitManager.search_habit_names("ing", db_path=test_db) == ["Grocery shopping", "House cleaning"]
+        assert HabitManager.search_habit_names("ing", limit=1, db_path=test_db) == ["Grocery shopping"]
+        assert HabitManager.search_habit_names("Excersise", db_path=test_db) == ["Exercise"]
+        assert HabitManager.search_habit_names("xyz", db_path=test_db) == []
+
+    def test_search_index(self, test_db):
+        """Tests that the search index follows changes and folds case beyond ASCII"""
+        HabitManager.create_habit("Äpfel essen", "daily", 10, db_path=test_db)
+        assert HabitManager.search_habit_names("äpf", db_path=test_db) == ["Äpfel essen"]
+        assert HabitManager.search_habit_names("ÄPFEL", db_path=test_db) == ["Äpfel essen"]
+        HabitManager.archive_habit("Äpfel essen", db_path=test_db)
+        assert HabitManager.search_habit_names("äpf", db_path=test_db) == []
+        HabitManager.restore_habit("Äpfel essen", db_path=test_db)
+        assert HabitManager.search_habit_names("pfel", db_path=test_db) == ["Äpfel essen"]
+
+    def test_search_index_after_vacuum(self, test_db):
+        """Tests that the search index still finds the right names after VACUUM and after migrating an old table"""
+        conn = get_connection(test_db)
+        conn.execute("CREATE TABLE old_habits AS SELECT " + queries.HABIT_COLUMNS + " FROM habits")
+        conn.execute("DROP TABLE habits")
+        conn.execute("ALTER TABLE old_habits RENAME TO habits")
+        conn.commit()
+        create_table(test_db)
+        assert HabitManager.search_habit_names("cleaning", db_path=test_db) == ["House cleaning"]
+
+        HabitManager.delete_habit("Brush teeth", db_path=test_db)
+        HabitManager.delete_habit("Exercise", db_path=test_db)
+        conn.execute("VACUUM")
+        assert HabitManager.search_habit_names("cleaning", db_path=test_db) == ["House cleaning"]
+        assert HabitManager.search_habit_names("book", db_path=test_db) == ["Read a book"]
+
+    def test_search_without_index(self, tmp_path, monkeypatch):
+        """Tests that the app still works with prefix search if SQLite does not support the search index"""
+        monkeypatch.setattr(queries, "CREATE_SEARCH_TABLES", [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS habit_name_trigrams USING fts5(name, tokenize='unknown')"])
+        db_path = str(tmp_path / 'test_without_index.db')
+        create_table(db_path)
+        add_predefined_habits(db_path)
+        assert HabitManager.search_habit_names("ex", db_path=db_path) == ["Exercise"]
+        assert HabitManager.search_habit_names("cleaning", db_path=db_path) == []
+
+    def test_uncomplete_habit(self, test_db):
+        """Tests removing a completion in the middle of a streak"""
+        habit = next((h for h in load_habits(test_db) if h.name == "Exercise"), None)
+        middle_date = sorted(habit.completed_dates)[9]
+        assert HabitManager.uncomplete_habit("Exercise", middle_date, db_path=test_db)
+        assert not HabitManager.uncomplete_habit("Exercise", middle_date, db_path=test_db)
+        habit = next((h for h in load_habits(test_db) if h.name == "Exercise"), None)
+        assert middle_date not in habit.completed_dates
+        assert habit.longest_streak == 10
+
+    def test_uncomplete_task(self):
+        """Tests that adding and removing dates keeps the longest streak in line with a full recalculation"""
+        habit = Habit(name="Swim", periodicity="weekly")
+        for completion_date in ["2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22", "2024-01-10"]:
+            habit.complete_task(completion_date)
+        assert habit.longest_streak == 2  # 2024-01-10 splits the run
+        habit.uncomplete_task("2024-01-10")
+        assert habit.longest_streak == 4
+        habit.uncomplete_task("2024-01-08")
+        assert habit.longest_streak == 2
+        expected = Habit(name="Swim", periodicity="weekly", completed_dates=list(habit.completed_dates))
+        expected.update_longest_streak()
+        assert habit.longest_streak == expected.longest_streak
@@ -0,0 +1,93 @@
+# tests/test_profiling.py
+
+import pytest
+import profiling
+from analytics import Analytics
+from model import HabitManager
+from database import create_table, add_predefined_habits, load_habits
+
+@pytest.fixture
+def test_db(tmp_path):
+    """
+    Fixture for setting up and tearing down a temporary test database.
+    """
+    db_path = tmp_path / 'test_profiling.db'
+    db_path = str(db_path)
+
+    create_table(db_path)
+    add_predefined_habits(db_path)
+
+    yield db_path
+
+
+@pytest.fixture
+def instrumentation():
+    """
+    Fixture that enables the instrumentation for one test and resets it afterwards.
+    """
+    profiling.reset()
+    profiling.enable()
+    yield
+    profiling.disable()
+    profiling.reset()
+
+
+class TestProfiling:
+    """
+    Tests the instrumentation of profiling.py
+    1. disabled_by_default
+    2. database_timings
+    3. method_timings
+    4. histogram
+    5. cprofile_capture
+    """
+
+    def test_disabled_by_default(self, test_db):
+        """Tests that nothing is recorded unless the instrumentation is enabled."""
+        profiling.reset()
+        load_habits(test_db)
+        stats = profiling.get_stats()
+        assert stats["operations"] == {}
+        assert stats["rows_read"] == 0
+
+    def test_database_timings(self, test_db, instrumentation):
+        """Tests that connects, queries, commits and rows are recorded."""
+        habits = load_habits(test_db)
+        HabitManager.create_habit("Meditate", "daily", 10, db_path=test_db)
+        stats = profiling.get_stats()
+        assert stats["operations"]["db.connect"]["calls"] == 1  # the connection is reused
+        assert stats["operations"]["db.query"]["calls"] >= 3
+        assert stats["operations"]["db.commit"]["calls"] == 1
+        assert stats["rows_read"] >= len(habits)
+        assert stats["rows_written"] == 1
+
+    def test_method_timings(self, test_db, instrumentation):
+        """Tests that HabitManager and Analytics methods are timed."""
+        HabitManager.get_all_habits(test_db)
+        Analytics.get_habit_with_longest_streak(db_path=test_db)
+        Analytics.get_habit_with_longest_streak(db_path=test_db)
+        operations = profiling.get_stats()["operations"]
+        assert operations["HabitManager.get_all_habits"]["calls"] == 1
+        assert operations["Analytics.get_habit_with_longest_streak"]["calls"] == 2
+
+    def test_histogram(self, instrumentation):
+        """Tests that recorded timings end up in the matching histogram bucket."""
+        profiling.record("op", 0.0002)
+        profiling.record("op", 0.003)
+        profiling.record("op", 5)
+        op = profiling.get_stats()["operations"]["op"]
+        assert op["calls"] == 3
+        assert op["histogram"]["<=0.5ms"] == 1
+        assert op["histogram"]["<=5ms"] == 1
+        assert op["histogram"][">1000ms"] == 1
+        assert op["max_ms"] == pytest.approx(5000)
+
+    def test_cprofile_capture(self, test_db, tmp_path):
+        """Tests that a cProfile capture is written to the given file."""
+        output_path = str(tmp_path / 'session.prof')
+        profiling.start_profile()
+        load_habits(test_db)
+        stats = profiling.stop_profile(output_path)
+        assert stats is not None
+        assert (tmp_path / 'session.prof').exists()
+        assert profiling.stop_profile() is None
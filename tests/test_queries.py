@@ -0,0 +1,72 @@
+# tests/test_queries.py
+
+import pytest
+import queries
+from model import HabitManager
+from analytics import Analytics
+from database import create_table, get_connection, close_connections, insert_habits
+
+SYNTHETIC_HABITS = 50_000
+
+@pytest.fixture(scope="module")
+def large_db(tmp_path_factory):
+    """
+    Fixture for a large synthetic database, so that the query planner sees realistic table statistics.
+    """
+    db_path = str(tmp_path_factory.mktemp("queries") / 'test_queries.db')
+    create_table(db_path)
+    rows = (
+        (f"habit {i}",
+         "daily" if i % 3 else "weekly",
+         "2024-01-01",
+         "2024-01-01,2024-01-02",
+         i % 30,
+         i % 3 + 1,
+         i,
+         i % 50,
+         0 if i % 3 else 2)
+        for i in range(SYNTHETIC_HABITS)
+    )
+    with get_connection(db_path) as conn:
+        insert_habits(conn, list(rows))
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    yield db_path
+
+
+class TestQueries:
+    """
+    Tests the query plans of queries.py
+    1. no_full_table_scans
+    2. detects_full_table_scan
+    3. indexed_lookups
+    4. connection_reused
+    """
+
+    def test_no_full_table_scans(self, large_db):
+        """Fails if any hot query falls back to a full table scan."""
+        with get_connection(large_db) as conn:
+            offenders = queries.find_full_table_scans(conn)
+        assert offenders == {}
+
+    def test_detects_full_table_scan(self, large_db):
+        """Tests that the plan check recognises a full table scan."""
+        with get_connection(large_db) as conn:
+            plan = queries.explain(conn, "SELECT name FROM habits WHERE goal_streak = ?", (5,))
+        assert any(step.startswith("SCAN") and "INDEX" not in step for step in plan)
+
+    def test_indexed_lookups(self, large_db):
+        """Tests that the indexed queries return the same results as the previous linear scans."""
+        weekly = HabitManager.get_habits_by_periodicity("Weekly", db_path=large_db)
+        assert len(weekly) == len(range(0, SYNTHETIC_HABITS, 3))
+        assert Analytics.get_longest_streak_for_habit("HABIT 49", db_path=large_db) == 49
+        habit = Analytics.get_habit_with_longest_streak(db_path=large_db)
+        assert habit.name == "habit 49"
+
+    def test_connection_reused(self, large_db):
+        """Tests that the connection, and with it the statement cache, is kept between calls."""
+        conn = get_connection(large_db)
+        assert get_connection(large_db) is conn
+        close_connections()
+        assert get_connection(large_db) is not conn
@@ -0,0 +1,67 @@
+# tests/test_seed.py
+
+import pytest
+from model import GREEN, YELLOW, RED, HabitManager
+from seed import seed_database
+from database import load_habits
+
+@pytest.fixture
+def test_db(tmp_path):
+    """
+    Fixture for a temporary test database filled with generated habits.
+    """
+    db_path = tmp_path / 'test_seed.db'
+    db_path = str(db_path)
+
+    seed_database(500, db_path, days=120, seed=42, end_date="2024-10-31", batch_size=100)
+
+    yield db_path
+
+
+class TestSeed:
+    """
+    Tests the generated data of seed.py
+    1. habits_written
+    2. reproducible
+    3. streaks_and_status
+    4. seed_again
+    5. search_index
+    """
+
+    def test_habits_written(self, test_db):
+        """Tests that all habits are written with unique names and both periodicities."""
+        habits = load_habits(test_db)
+        assert len(habits) == 500
+        assert len({habit.name for habit in habits}) == 500
+        assert {habit.periodicity for habit in habits} == {"daily", "weekly"}
+        assert all(d <= "2024-10-31" for habit in habits for d in habit.completed_dates)
+
+    def test_reproducible(self, test_db, tmp_path):
+        """Tests that the same seed produces the same database."""
+        other_db = str(tmp_path / 'other.db')
+        seed_database(500, other_db, days=120, seed=42, end_date="2024-10-31")
+        first = [(h.name, h.completed_dates, h.longest_streak) for h in load_habits(test_db)]
+        second = [(h.name, h.completed_dates, h.longest_streak) for h in load_habits(other_db)]
+        assert first == second
+
+    def test_streaks_and_status(self, test_db):
+        """Tests that the stored longest streak matches the one calculated by Habit."""
+        for habit in load_habits(test_db):
+            stored = habit.longest_streak
+            habit.update_longest_streak()
+            assert habit.longest_streak == stored
+            assert habit.status in (GREEN, YELLOW, RED)
+
+    def test_seed_again(self, test_db):
+        """Tests that seeding an existing database adds habits instead of failing on duplicates."""
+        seed_database(10, test_db, days=30, seed=42)
+        habits = load_habits(test_db)
+        assert len(habits) == 510
+        assert max(habit.position for habit in habits) == 509
+
+    def test_search_index(self, test_db):
+        """Tests that bulk inserted habits are searchable and later habits are still indexed."""
+        name = load_habits(test_db)[250].name
+        assert HabitManager.search_habit_names(name[2:], db_path=test_db) == [name]
+        HabitManager.create_habit("Bake bread", "weekly", 4, db_path=test_db)
+        assert HabitManager.search_habit_names("bread", db_path=test_db) == ["Bake bread"]
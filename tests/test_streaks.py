@@ -0,0 +1,106 @@
+# tests/test_streaks.py
+
+import random
+from datetime import date, timedelta
+import pytest
+import streaks
+from model import Habit, HabitManager, COMPLETE_EVENT, UNDO_EVENT
+from database import (create_table, save_habit, load_habit, get_connection,
+                      append_completion_events, compact_events)
+
+@pytest.fixture
+def test_db(tmp_path):
+    """
+    Fixture for setting up and tearing down a temporary test database.
+    """
+    db_path = tmp_path / 'test_streaks.db'
+    db_path = str(db_path)
+
+    create_table(db_path)
+
+    yield db_path
+
+
+def _stored_runs(name: str, db_path: str) -> int:
+    """Returns the number of stored runs of a habit."""
+    c = get_connection(db_path).cursor()
+    c.execute("SELECT COUNT(*) FROM streak_runs WHERE name = ?", (name,))
+    return c.fetchone()[0]
+
+
+class TestStreaks:
+    """
+    Tests the stored streak runs of streaks.py
+    1. matches_full_recalculation
+    2. weekly_split_and_merge
+    3. day_format
+    4. runs_rebuilt_when_missing
+    5. runs_deleted_with_habit
+    """
+
+    @pytest.mark.parametrize("periodicity", ["daily", "weekly", "monthly"])
+    def test_matches_full_recalculation(self, test_db, periodicity):
+        """Tests that random completions and undos keep the longest streak in line with Habit.update_longest_streak."""
+        rng = random.Random(7)
+        start = date(2024, 1, 1)
+        days = [str(start + timedelta(days=i)) for i in range(120)]
+        if periodicity == "weekly":
+            days = days[::7] + rng.sample(days, 10)  # mostly Mondays, some dates in between
+        habit = Habit(name="Swim", periodicity=periodicity, completed_dates=rng.sample(days, len(days) // 2))
+        habit.update_longest_streak()
+        save_habit(habit, test_db)
+
+        for _ in range(30):
+            events = [(habit.name, rng.choice(days), rng.choice([COMPLETE_EVENT, UNDO_EVENT])) for _ in range(5)]
+            append_completion_events(events, test_db)
+            compact_events(test_db)
+            stored = load_habit("Swim", test_db)
+            expected = Habit(name="Swim", periodicity=periodicity, completed_dates=list(stored.completed_dates))
+            expected.update_longest_streak()
+            assert stored.longest_streak == expected.longest_streak
+            assert len(stored.completed_dates) == len(set(stored.completed_dates))
+
+    def test_weekly_split_and_merge(self, test_db):
+        """Tests that a date between two weekly completions splits their run and removing it merges them again."""
+        habit = Habit(name="Swim", periodicity="weekly",
+                      completed_dates=["2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22"], longest_streak=4)
+        save_habit(habit, test_db)
+        append_completion_events([("Swim", "2024-01-10", COMPLETE_EVENT)], test_db)
+        compact_events(test_db)
+        assert load_habit("Swim", test_db).longest_streak == 2
+        assert _stored_runs("Swim", test_db) == 3
+        append_completion_events([("Swim", "2024-01-10", UNDO_EVENT)], test_db)
+        compact_events(test_db)
+        assert load_habit("Swim", test_db).longest_streak == 4
+        assert _stored_runs("Swim", test_db) == 1
+
+    def test_day_format(self):
+        """Tests that only YYYY-MM-DD dates are turned into day numbers."""
+        assert streaks.day("2099-01-05") == date(2099, 1, 5).toordinal()
+        with pytest.raises(ValueError):
+            streaks.day("20990105")
+
+    def test_runs_rebuilt_when_missing(self, test_db):
+        """Tests that the next compaction builds missing runs from the completed dates."""
+        habit = Habit(name="Run", periodicity="daily", completed_dates=["2024-01-01", "2024-01-02"], longest_streak=2)
+        save_habit(habit, test_db)
+        append_completion_events([("Run", "2024-01-03", COMPLETE_EVENT)], test_db)
+        compact_events(test_db)
+        assert _stored_runs("Run", test_db) == 1
+
+        with get_connection(test_db) as conn:
+            conn.execute("DELETE FROM streak_runs WHERE name = ?", ("Run",))
+        append_completion_events([("Run", "2024-01-05", COMPLETE_EVENT)], test_db)
+        compact_events(test_db)
+        assert load_habit("Run", test_db).longest_streak == 3
+        assert _stored_runs("Run", test_db) == 2
+
+    def test_runs_deleted_with_habit(self, test_db):
+        """Tests that deleting a habit removes its runs."""
+        habit = Habit(name="Run", periodicity="daily", completed_dates=["2024-01-01"], longest_streak=1)
+        save_habit(habit, test_db)
+        append_completion_events([("Run", "2024-01-03", COMPLETE_EVENT)], test_db)
+        compact_events(test_db)
+        assert _stored_runs("Run", test_db) == 2
+        assert HabitManager.delete_habit("Run", db_path=test_db)
+        assert _stored_runs("Run", test_db) == 0